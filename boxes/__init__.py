@@ -17,33 +17,28 @@ from __future__ import annotations
 
 import argparse
 import copy
+import inspect
 import math
 import random
 import re
 import sys
+import time
 from argparse import ArgumentParser
 from contextlib import contextmanager
-from functools import wraps
+from functools import cached_property, wraps
 from shlex import quote
 from typing import Any
 from xml.sax.saxutils import quoteattr
 
-from shapely.geometry import *
-from shapely.ops import split
 import gettext
 
 from boxes import edges
 from boxes import formats
-from boxes import gears
 from boxes import parts
-from boxes import pulley
 from boxes import svgutil
 from boxes.Color import *
 from boxes.vectors import kerf
 
-import qrcode
-from boxes.qrcode_factory import BoxesQrCodeFactory
-
 ### Helpers
 
 def dist(dx, dy):
@@ -55,6 +50,39 @@ def dist(dx, dy):
     """
     return (dx * dx + dy * dy) ** 0.5
 
+def ringDistances(ring, points):
+    """
+    Return distances of many points to a (shapely) ring
+
+    Uses the vectorized functions of shapely 2 if available and computes
+    the distances of the points to all segments with numpy otherwise.
+
+    :param ring: shapely LinearRing or LineString
+    :param points: list of (x, y) tuples
+    """
+    if not points:
+        return []
+    import shapely
+    if hasattr(shapely, "distance"): # shapely >= 2.0
+        return shapely.distance(ring, shapely.points(points)).tolist()
+
+    import numpy as np
+    p = np.array(points, dtype=float)
+    px, py = p[:, 0:1], p[:, 1:2]
+    c = np.array(ring.coords, dtype=float)
+    ax, ay, bx, by = c[:-1, 0], c[:-1, 1], c[1:, 0], c[1:, 1]
+    # same calculation as GEOS' Distance::pointToSegment
+    dx, dy = bx - ax, by - ay
+    len2 = dx * dx + dy * dy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = ((px - ax) * dx + (py - ay) * dy) / len2
+        s = ((ay - py) * dx - (ax - px) * dy) / len2
+    da = np.sqrt((px - ax) * (px - ax) + (py - ay) * (py - ay))
+    db = np.sqrt((px - bx) * (px - bx) + (py - by) * (py - by))
+    d = np.where((r <= 0.0) | (len2 == 0.0), da,
+                 np.where(r >= 1.0, db, np.abs(s) * np.sqrt(len2)))
+    return d.min(axis=1).tolist()
+
 def restore(func):
     """
     Wrapper: Restore coordinates after function
@@ -72,6 +100,24 @@ def restore(func):
     return f
 
 
+def timed(phase):
+    """
+    Wrapper: Add the time spent in the method to self.timings
+
+    :param phase: name to report the time as
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def f(self, *args, **kw):
+            with self.timing(phase):
+                return func(self, *args, **kw)
+
+        return f
+
+    return decorator
+
+
 def holeCol(func):
     """
     Wrapper: color holes differently
@@ -95,6 +141,84 @@ def holeCol(func):
     return f
 
 
+def instanced(func):
+    """
+    Wrapper: draw repeated shapes by copying them
+
+    Records what the function draws relative to its x, y parameters and
+    replays it for later calls with the same other parameters, burn and
+    orientation. Must be applied inside holeCol (if used).
+
+    :param func: function to wrap
+    """
+
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def f(self, *args, **kw):
+        if not self.instancing:
+            return func(self, *args, **kw)
+        params = signature.bind(self, *args, **kw).arguments
+        del params["self"]
+        x, y = params.pop("x", 0), params.pop("y", 0)
+        a, b, _, d, e, _ = self.ctx._m
+        key = (func.__name__, tuple(params.items()), self.burn,
+               a, b, d, e, self.ctx._rgb, self.ctx._lw)
+        try:
+            recording = self._instances.get(key)
+        except TypeError:  # unhashable parameters
+            return func(self, *args, **kw)
+        if recording is None:
+            with self.ctx.recording(x, y) as recording:
+                func(self, *args, **kw)
+            if recording.translatable:
+                self._instances[key] = recording
+        self.ctx.replay(recording, x, y)
+
+    return f
+
+
+def memoizedPart(func):
+    """
+    Wrapper: draw repeated parts by copying them
+
+    Only active if the generator sets Boxes.partcaching. Records what the
+    part draws between its two move() calls and replays it for later calls
+    with the same parameters (but move and label), edges, burn and pen.
+    Parts with callbacks are always drawn.
+
+    :param func: function to wrap
+    """
+
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def f(self, *args, **kw):
+        if not self.partcaching:
+            return func(self, *args, **kw)
+        params = signature.bind(self, *args, **kw).arguments
+        del params["self"]
+        params.pop("move", None)
+        label = params.pop("label", "")
+        if params.get("callback") or params.get("turtle"):
+            return func(self, *args, **kw)
+        try:
+            key = (func.__name__, self._partKey(params), self.burn,
+                   self.thickness, self.tabs, self.debug,
+                   self.ctx._rgb, self.ctx._lw)
+            hash(key)
+        except TypeError:  # unhashable parameters
+            return func(self, *args, **kw)
+        # picked up by the move() call at the start of the part
+        self._part_key = (key, label)
+        try:
+            return func(self, *args, **kw)
+        finally:
+            self._part_key = None
+
+    return f
+
+
 #############################################################################
 ### Building blocks
 #############################################################################
@@ -229,6 +353,38 @@ class BoolArg:
 boolarg = BoolArg()
 
 
+class CachedArgParser:
+    """Stand-in for the ArgumentParser of a generator whose class already
+    built one
+
+    Adding arguments and setting defaults is ignored as the parser
+    already has them. Everything else is passed on to the parser which
+    is shared by all instances of the class and must not be changed.
+    """
+
+    def __init__(self, parser) -> None:
+        self.parser = parser
+        self.defaults: dict[str, Any] = {}
+
+    def add_argument(self, *args, **kw):
+        pass
+
+    def add_argument_group(self, *args, **kw):
+        return self
+
+    def set_defaults(self, **kw):
+        pass
+
+    def get_default(self, dest):
+        # ArgumentParser.get_default() searches through all arguments
+        if dest not in self.defaults:
+            self.defaults[dest] = self.parser.get_default(dest)
+        return self.defaults[dest]
+
+    def __getattr__(self, name):
+        return getattr(self.parser, name)
+
+
 class HexHolesSettings(edges.Settings):
     """Settings for hexagonal hole patterns
 
@@ -263,6 +419,7 @@ Values:
   * hole_min_radius :     4.0 : minimum radius of generated holes (in mm)
   * space_between_holes : 4.0 : hole to hole spacing (in mm)
   * space_to_border :     4.0 : hole to border spacing (in mm)
+  * random_seed :         0 : seed for the random pattern
 
 """
 
@@ -275,6 +432,7 @@ Values:
         "hole_min_radius":     0.5,
         "space_between_holes": 4.0,
         "space_to_border":     4.0,
+        "random_seed":         0,
     }
 
 ##############################################################################
@@ -285,22 +443,30 @@ class Boxes:
     """Main class -- Generator should subclass this """
 
     webinterface = True
+    # draw repeated holes by copying them (see instanced)
+    instancing = True
+    # draw repeated edges by replaying a recording (see edges.recorded)
+    edgecaching = True
+    # draw repeated parts by copying them (see memoizedPart). Only for
+    # generators that don't change the edges or settings between parts
+    partcaching = False
     ui_group = "Misc"
     UI = ""
 
     description: str = ""  # Markdown syntax is supported
 
+    # CachedArgParsers by (class, UI, ArgumentParser class)
+    _argparsers: dict[Any, Any] = {}
+
     def __init__(self) -> None:
         self.formats = formats.Formats()
         self.ctx = None
-        description: str = self.__doc__ or ""
-        if self.description:
-            description += "\n\n" + self.description
-        self.argparser = ArgumentParser(description=description)
         self.edgesettings: dict[Any, Any] = {}
         self.inkscapefile = None
         self.non_default_args: dict[Any, Any] = {}
         self.translations = gettext.NullTranslations()
+        # {phase : seconds} when collecting timings, see reportTimings()
+        self.timings: dict[str, float] | None = None
 
         self.metadata = {
             "name" : self.__class__.__name__,
@@ -311,11 +477,21 @@ class Boxes:
             "url_short" : "",
             "cli" : "",
             "cli_short" : "",
+            "creation_date" : None,
         }
 
         # Dummy attribute for static analytic tools. Will be overwritten by `argparser` at runtime.
         self.thickness: float = 0.0
 
+        parser = self._argparsers.get(self._argparserKey())
+        if parser is not None:
+            self.argparser = parser
+            return
+
+        description: str = self.__doc__ or ""
+        if self.description:
+            description += "\n\n" + self.description
+        self.argparser = ArgumentParser(description=description)
         self.argparser._action_groups[1].title = self.__class__.__name__ + " Settings"
         defaultgroup = self.argparser.add_argument_group(
                         "Default Settings")
@@ -379,6 +555,7 @@ class Boxes:
         """
         self.ctx.set_font(style, bold, italic)
 
+    @timed("open")
     def open(self):
         """
         Prepare for rendering
@@ -391,6 +568,12 @@ class Boxes:
 
         self.bedBoltSettings = (3, 5.5, 2, 20, 15)  # d, d_nut, h_nut, l, l1
         self.surface, self.ctx = self.formats.getSurface(self.format, self.output)
+        self._instances = {}
+        self._edge_recordings = {}
+        self._part_recordings = {}
+        self._part_key = None
+        # (key, depth of the context stack) of the parts being recorded
+        self._part_frames: list[Any] = []
 
         if self.format == 'svg_Ponoko':
             self.ctx.set_line_width(0.01)
@@ -440,6 +623,8 @@ class Boxes:
         * boolarg: outside
         * str (selection): nema_mount
         """
+        if isinstance(self.argparser, CachedArgParser):
+            return
         for arg in l:
             kw[arg] = None
         for arg, default in kw.items():
@@ -524,16 +709,24 @@ class Boxes:
 
     def addSettingsArgs(self, settings, prefix=None, **defaults):
         prefix = prefix or settings.__name__[:-len("Settings")]
-        settings.parserArguments(self.argparser, prefix, **defaults)
+        if not isinstance(self.argparser, CachedArgParser):
+            settings.parserArguments(self.argparser, prefix, **defaults)
         self.edgesettings[prefix] =  {}
 
+    def _argparserKey(self):
+        return (self.__class__, self.UI, ArgumentParser)
+
 
+    @timed("parseArgs")
     def parseArgs(self, args=None):
         """
         Parse command line parameters
 
         :param args:  (Default value = None) parameters, None for using sys.argv
         """
+        if not isinstance(self.argparser, CachedArgParser):
+            # __init__() is done - share the parser with later instances
+            self._argparsers[self._argparserKey()] = CachedArgParser(self.argparser)
         if args is None:
             args = sys.argv[1:]
         if len(args) > 1 and args[-1][0] != "-":
@@ -587,6 +780,30 @@ class Boxes:
         for part in parts:
             self.addPart(part)
 
+    def _partKey(self, params):
+        """Hashable form of the parameters of a part - see memoizedPart"""
+
+        def value(v):
+            if isinstance(v, (list, tuple)):
+                return tuple(value(i) for i in v)
+            if isinstance(v, edges.Settings):
+                return v.key()
+            return v
+
+        result = []
+        for name, v in params.items():
+            if name in ("edges", "edge"):
+                # the edges by their state instead of their names
+                try:
+                    v = [self.edges.get(e, e) for e in v]
+                except TypeError:
+                    v = [self.edges.get(v, v)]
+                v = tuple(e.recordingKey({}) if isinstance(e, edges.BaseEdge)
+                          else e for e in v)
+            result.append((name, value(v)))
+        return tuple(result)
+
+    @timed("_buildObjects")
     def _buildObjects(self):
         """Add default edges and parts"""
         self.edges = {}
@@ -646,14 +863,26 @@ class Boxes:
 
         # Nuts
         self.addPart(NutHole(self, None))
-        # Gears
-        self.addPart(gears.Gears(self))
+        # Gears and Pulley are created on first use (see below)
+        self.__dict__.pop("gears", None)
+        self.__dict__.pop("pulley", None)
         s = edges.GearSettings(self.thickness, True,
                 **self.edgesettings.get("Gear", {}))
         self.addPart(edges.RackEdge(self, s))
-        self.addPart(pulley.Pulley(self))
         self.addPart(parts.Parts(self))
 
+    @cached_property
+    def gears(self):
+        """Gears part - imported on first use"""
+        from boxes import gears
+        return gears.Gears(self)
+
+    @cached_property
+    def pulley(self):
+        """Pulley part - imported on first use"""
+        from boxes import pulley
+        return pulley.Pulley(self)
+
     def adjustSize(self, l, e1=True, e2=True):
         # Char to edge object
         e1 = self.edges.get(e1, e1)
@@ -749,9 +978,11 @@ class Boxes:
         self.surface.set_metadata(self.metadata)
 
         self.surface.flush()
-        self.surface.finish(self.inner_corners)
+        with self.timing("Surface.finish"):
+            self.surface.finish(self.inner_corners)
 
-        self.formats.convert(self.output, self.format, self.metadata)
+        with self.timing("Formats.convert"):
+            self.formats.convert(self.output, self.format, self.metadata)
         if self.inkscapefile:
             try:
                 out = sys.stdout.buffer
@@ -759,6 +990,55 @@ class Boxes:
                 out= sys.stdout
             svgutil.svgMerge(self.output, self.inkscapefile, out)
 
+    @contextmanager
+    def timing(self, phase):
+        """Add the time spent in the with block to self.timings
+
+        Does nothing unless self.timings is set to a dict.
+
+        :param phase: name to report the time as
+        """
+        if self.timings is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = (self.timings.get(phase, 0.0)
+                                   + time.perf_counter() - start)
+
+    def reportTimings(self, file=None):
+        """Print the collected timings and the size of the parts
+
+        Call after .close()
+
+        :param file:  (Default value = None) stream to write to, None for stderr
+        """
+        file = file or sys.stderr
+        timings = self.timings or {}
+        print("Timings [s]:", file=file)
+        for phase in ("parseArgs", "open", "_buildObjects", "render",
+                      "Surface.finish", "Formats.convert"):
+            if phase in timings:
+                indent = "    " if phase == "_buildObjects" else "  "
+                print(f"{indent}{phase:<{20 - len(indent)}}{timings[phase]:9.3f}", file=file)
+        print(f"  {'total':<18}{sum(t for p, t in timings.items() if p != '_buildObjects'):9.3f}",
+              file=file)
+
+        surface = getattr(self, "surface", None)
+        if surface is None:
+            return
+        print(f"{'part':>6} {'paths':>7} {'segments':>9}", file=file)
+        total_paths = total_segments = 0
+        for i, part in enumerate(surface.parts):
+            paths = len(part.pathes)
+            segments = sum(len(p) for p in part.pathes)
+            total_paths += paths
+            total_segments += segments
+            print(f"{i:6d} {paths:7d} {segments:9d}", file=file)
+        print(f"{'total':>6} {total_paths:7d} {total_segments:9d}", file=file)
+
     ############################################################
     ### Turtle graphics commands
     ############################################################
@@ -1180,6 +1460,10 @@ class Boxes:
 
         terms = where.split()
         dontdraw = before and "only" in terms
+        width, height = x, y
+        part = None
+        if before:
+            part, self._part_key = self._part_key, None
 
         x += self.spacing
         y += self.spacing
@@ -1198,6 +1482,13 @@ class Boxes:
         }
 
         if not before:
+            if (self._part_frames and
+                    self._part_frames[-1][1] == len(self.ctx._stack)):
+                # end of a part being recorded - draw it
+                key = self._part_frames.pop()[0]
+                recording = self.ctx.end_local_recording()
+                self._part_recordings[key] = recording.translatable and recording
+                self.ctx.replay_local(recording)
             # restore position
             self.ctx.restore()
             if self.labels and label:
@@ -1230,6 +1521,22 @@ class Boxes:
                 self.moveTo(self.spacing / 2.0, self.spacing / 2.0)
         self.ctx.new_part()
 
+        if part is not None and not dontdraw:
+            # parts get recorded when drawn the second time. False marks
+            # parts that can't be recorded
+            key, label = part
+            recording = self._part_recordings.get(key, ())
+            if recording == ():
+                self._part_recordings[key] = None
+            elif recording is None:
+                self._part_frames.append((key, len(self.ctx._stack)))
+                self.ctx.begin_local_recording()
+            elif recording:
+                # draw a copy and let the caller skip drawing the part
+                self.ctx.replay_local(recording)
+                self.move(width, height, where, label=label)
+                return True
+
         return dontdraw
 
     @restore
@@ -1253,6 +1560,7 @@ class Boxes:
 
     @restore
     @holeCol
+    @instanced
     def regularPolygonHole(self, x, y, r=0.0, d=0.0, n=6, a=0.0, tabs=0, corner_radius=0.0):
         """
         Draw a hole in shape of an n-edged regular polygon
@@ -1297,6 +1605,7 @@ class Boxes:
 
     @restore
     @holeCol
+    @instanced
     def hole(self, x, y, r=0.0, d=0.0, tabs=0):
         """
         Draw a round hole
@@ -1316,6 +1625,7 @@ class Boxes:
 
     @restore
     @holeCol
+    @instanced
     def rectangularHole(self, x, y, dx, dy, r=0, center_x=True, center_y=True):
         """
         Draw a rectangular hole
@@ -1505,6 +1815,7 @@ class Boxes:
 
     @restore
     @holeCol
+    @instanced
     def TX(self, size, x=0, y=0, angle=0):
         """Draw a star pattern
 
@@ -1539,6 +1850,7 @@ class Boxes:
     }
 
     @restore
+    @instanced
     def NEMA(self, size, x=0, y=0, angle=0, screwholes=None):
         """Draw holes for mounting a NEMA stepper motor
 
@@ -1571,24 +1883,28 @@ class Boxes:
 
         self.ctx.save()
         self.ctx.move_to(*lines[0])
-
-        for x, y in lines[1:]:
-            self.ctx.line_to(x, y)
-
+        points = list(lines[1:])
         if close:
-            self.ctx.line_to(*lines[0])
+            points.append(lines[0])
+        self.ctx.lines(points)
         self.ctx.restore()
 
     def qrcode(self, content, box_size=1.0, color=Color.ETCHING, move=None):
-        q = qrcode.QRCode(image_factory=BoxesQrCodeFactory, box_size=box_size*10)
-        q.add_data(content)
-        m = q.get_matrix()
-        tw, th = len(m) * box_size, len(m[0]) * box_size
+        from boxes.qrcode_factory import BoxesQrCodeFactory, qrcode_modules
+
+        modules = qrcode_modules(content)
+        border = 4
+        tw = th = (len(modules) + 2 * border) * box_size
         if self.move(tw, th, move, True):
             return
 
         self.set_source_color(color)
-        q.make_image(ctx=self.ctx)
+        img = BoxesQrCodeFactory(border, len(modules), box_size*10, ctx=self.ctx)
+        for row, line in enumerate(modules):
+            for col, dark in enumerate(line):
+                if dark:
+                    img.drawrect(row, col)
+        img.process()
 
         self.move(tw, th, move)
 
@@ -1616,9 +1932,81 @@ class Boxes:
             self.hole(x, y, 0.5, color=color)
             self.text(str(i), x, y, fontsize=2, color=color)
 
+    def _randomHoles(self, borderPoly, max_radius, hspace, bspace, min_radius, max_random, seed):
+        """
+        Poisson disk sampling with variable radii (after Bridson)
+
+        New holes are placed around already placed ones so that they touch
+        them. Holes are found via a background grid. If no more holes fit
+        random points are tried to start in other areas.
+
+        :return: list of (x, y, r)
+        """
+        from shapely.geometry import Point
+        from shapely.prepared import prep
+
+        rnd = random.Random(seed)
+        inside = prep(borderPoly.buffer(-(bspace + min_radius)))
+        exterior = borderPoly.exterior
+        min_x, min_y, max_x, max_y = borderPoly.bounds
+        cell = 2 * max_radius + hspace
+        grid = {}
+        holes = []
+        active = []
+
+        def radius(x, y):
+            # largest radius possible at x, y
+            r = max_radius
+            gx, gy = int(x // cell), int(y // cell)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for x2, y2, r2 in grid.get((gx + dx, gy + dy), ()):
+                        r = min(r, dist(x - x2, y - y2) - r2 - hspace)
+                        if r < min_radius:
+                            return r
+            pt = Point(x, y)
+            if not inside.contains(pt):
+                return 0
+            return min(r, exterior.distance(pt) - bspace)
+
+        misses = 0 # in a row
+        while len(holes) < max_random:
+            if active:
+                # try to place a new hole next to a random active one
+                i = rnd.randrange(len(active))
+                x0, y0, r0 = active[i]
+                for k in range(12):
+                    # full size hole touching the active one
+                    angle = rnd.uniform(0, 2 * math.pi)
+                    d = r0 + hspace + max_radius
+                    x, y = x0 + d * math.cos(angle), y0 + d * math.sin(angle)
+                    r = radius(x, y)
+                    if r >= min_radius:
+                        break
+                else:
+                    # no room left around this hole
+                    active[i] = active[-1]
+                    active.pop()
+                    continue
+            else:
+                if misses >= 20:
+                    break
+                x = rnd.uniform(min_x + bspace, max_x - bspace)
+                y = rnd.uniform(min_y + bspace, max_y - bspace)
+                r = radius(x, y)
+                if r < min_radius:
+                    misses += 1
+                    continue
+                misses = 0
+            holes.append((x, y, r))
+            active.append((x, y, r))
+            grid.setdefault((int(x // cell), int(y // cell)), []).append((x, y, r))
+
+        return holes
+
     @restore
     @holeCol
-    def fillHoles(self, pattern, border, max_radius, hspace=3, bspace=0, min_radius=0.5, style="round", bar_length=50, max_random=1000):
+    def fillHoles(self, pattern, border, max_radius, hspace=3, bspace=0, min_radius=0.5, style="round", bar_length=50, max_random=1000, seed=None):
         """
         fill a polygon defined by its outline with holes
 
@@ -1631,9 +2019,16 @@ class Boxes:
         :param style:       defines hole style - currently one of "round", "triangle", "square", "hexagon" or "octagon"
         :param bar_length:  maximum bar length
         :param max_random:  maximum number of random holes
+        :param seed:        seed for the random pattern (None for the fillHoles_random_seed setting or 0)
         """
         if pattern not in ["random", "hex", "square", "hbar", "vbar"]:
             return
+        if seed is None:
+            seed = getattr(self, "fillHoles_random_seed", 0)
+
+        from shapely.geometry import LineString, Point, Polygon
+        from shapely.ops import split
+        from shapely.prepared import prep
 
         a = 0
         if style == "round":
@@ -1686,50 +2081,10 @@ class Boxes:
             max_radius_y = (max_y - min_y - 2 * bspace - (ny - 1) * hspace) / ny / 2
 
         if pattern == "random":
-            grid = {}
-            misses = 0 # in a row
-            while i < max_random and misses < 20:
-                i += 1
-                misses += 1
-                # random new point
-                x = random.randrange(math.floor(min_x + bspace), math.ceil(max_x - bspace)) # randomness takes longer to compute
-                y = random.randrange(math.floor(min_y + bspace), math.ceil(max_y - bspace)) # but generates a new pattern for each run
-                pt = Point(x, y).buffer(min_radius + bspace)
-                # check if point is within border
-                if borderPoly.contains(pt):
-                    pt1 = Point(x, y)
-                    grid_x = int(x//(2*max_radius+hspace))
-                    grid_y = int(y//(2*max_radius+hspace))
-                    # compute distance between hole and border
-                    bdist = borderPoly.exterior.distance(pt1) - bspace
-                    # compute minimum distance to all other holes
-                    hdist = max_radius
-                    try: # learned from https://medium.com/techtofreedom/5-ways-to-break-out-of-nested-loops-in-python-4c505d34ace7
-                        for gx in (-1, 0, 1):
-                            for gy in (-1, 0, 1):
-                                for pt2 in grid.get((grid_x+gx, grid_y+gy), []):
-                                    pt3 = Point(pt2.x, pt2.y)
-                                    hdist = min(hdist, pt1.distance(pt3) - pt2.z - hspace)
-                                    if hdist < min_radius:
-                                        hdist = 0
-                                        raise StopIteration
-                    except StopIteration:
-                        pass
-                    # find maximum radius depending on distances
-                    r = min(bdist, hdist)
-                    # if too small, dismiss cycle
-                    if r < min_radius:
-                        continue
-                    # if too large, limit to max size
-                    if r > max_radius:
-                        r = max_radius
-                    # store in grid with radius as z value
-                    grid.setdefault((grid_x, grid_y), []).append(
-                        Point(x, y, r))
-                    misses = 0
-                    # and finally paint the hole
-                    self.regularPolygonHole(x, y, r=r, n=n, a=a)
-                    # rinse and repeat
+            for x, y, r in self._randomHoles(
+                    borderPoly, max_radius, hspace, bspace, min_radius,
+                    max_random, seed):
+                self.regularPolygonHole(x, y, r=r, n=n, a=a)
 
         elif pattern in ("square", "hex"):
             # use 'optimum' hole size
@@ -1748,6 +2103,8 @@ class Boxes:
             # shrink original polygon to get place for full size polygons
             innerCutPoly = borderPoly.buffer(-1 * (bspace + max_radius - 0.0001), join_style=2)
             innerTestPoly = borderPoly.buffer(-1 * (bspace + max_radius - 0.001), join_style=2)
+            outerTest = prep(outerTestPoly)
+            innerTest = prep(innerTestPoly)
 
             # get left and right boundaries of cut polygon
             x_cpl, y_cpl, x_cpr, y_cpr = outerCutPoly.bounds
@@ -1758,6 +2115,9 @@ class Boxes:
 
             # set startpoint
             y = min_y + bspace + max_radius_y
+            # (x, y, r) of all holes, r is None for holes to be sized
+            # according to their distance to the border
+            holes = []
 
             while y < (max_y - bspace - max_radius_y):
                 if pattern == "square" or row % 2 == 0:
@@ -1771,6 +2131,9 @@ class Boxes:
                 outer_line_split = split(line_complete, outerCutPoly)
                 line_complete = LineString([(x_cpl, y), (max_x + 1, y)])
                 inner_line_split = split(line_complete, innerCutPoly)
+                # x_min, x_max and if usable for each inner line
+                inner_lines = [(line.bounds[0], line.bounds[2], innerTest.contains(line))
+                               for line in inner_line_split.geoms]
                 inner_line_index = 0
 
                 if self.debug and False:
@@ -1794,42 +2157,37 @@ class Boxes:
                             self.moveTo(x_end, y_end ,0)
                             self.hole(0, 0, 0.5)
 
-                    if not outerTestPoly.contains(line_this):
+                    if not outerTest.contains(line_this):
                         continue
                     x_start, y_start , x_end, y_end = line_this.bounds
                     #initialize walking x coordinate
                     xw = (math.ceil((x_start - xs) / (2 * max_radius_x + hspace)) * (2 * max_radius_x + hspace)) + xs
 
                     # look up matching inner line
-                    while (inner_line_index < len(inner_line_split) and
-                           (inner_line_split.geoms[inner_line_index].bounds[2] <  xw
-                            or not innerTestPoly.contains(inner_line_split.geoms[inner_line_index]))):
+                    while (inner_line_index < len(inner_lines) and
+                           (inner_lines[inner_line_index][1] <  xw
+                            or not inner_lines[inner_line_index][2])):
                         inner_line_index += 1
 
                     # and process line
                     while not xw > x_end:
                         # are we in inner polygon already?
-                        if (len(inner_line_split) > inner_line_index and
-                            xw > inner_line_split.geoms[inner_line_index].bounds[0]):
+                        if (len(inner_lines) > inner_line_index and
+                            xw > inner_lines[inner_line_index][0]):
                             # place inner, full size polygons
-                            while xw < inner_line_split.geoms[inner_line_index].bounds[2]:
-                                self.regularPolygonHole(xw, y, r=max_radius, n=n, a=a)
+                            while xw < inner_lines[inner_line_index][1]:
+                                holes.append((xw, y, max_radius))
                                 xw += (2 * max_radius_x + hspace)
                             # forward to next inner line
-                            while (inner_line_index < len(inner_line_split) and
-                                   (inner_line_split.geoms[inner_line_index].bounds[0] <  xw
-                                    or not innerTestPoly.contains(inner_line_split.geoms[inner_line_index]))):
+                            while (inner_line_index < len(inner_lines) and
+                                   (inner_lines[inner_line_index][0] <  xw
+                                    or not inner_lines[inner_line_index][2])):
                                 inner_line_index += 1
                             if xw > x_end:
                                 break
 
-                        # Check distance to border to size the polygon
-                        pt = Point(xw, y)
-                        r = min(borderPoly.exterior.distance(pt) - bspace,
-                                max_radius)
-                        # if too small, dismiss
-                        if r >= min_radius:
-                            self.regularPolygonHole(xw, y, r=r, n=n, a=a)
+                        # sized by the distance to the border below
+                        holes.append((xw, y, None))
                         xw += (2 * max_radius_x + hspace)
 
                 row += 1
@@ -1838,6 +2196,17 @@ class Boxes:
                 else:
                     y += (math.sqrt(3) / 2 * (2 * max_radius_y + hspace)) - 0.0001
 
+            # Check distance to border to size the polygons - all at once
+            distances = iter(ringDistances(
+                borderPoly.exterior, [(x, y) for x, y, r in holes if r is None]))
+            for x, y, r in holes:
+                if r is None:
+                    r = min(next(distances) - bspace, max_radius)
+                    # if too small, dismiss
+                    if r < min_radius:
+                        continue
+                self.regularPolygonHole(x, y, r=r, n=n, a=a)
+
         elif pattern == "hbar":
             # 'optimum' hole size to be used
             max_radius = max_radius_y
@@ -1848,6 +2217,7 @@ class Boxes:
             #shrink original polygon
             shrinkPoly = borderPoly.buffer(-1 * (bspace + max_radius - 0.01), join_style=2)
             cutPoly = borderPoly.buffer(-1 * (bspace + max_radius - 0.000001), join_style=2)
+            shrinkTest = prep(shrinkPoly)
 
             if self.debug:
                 self.showBorderPoly(list(shrinkPoly.exterior.coords))
@@ -1887,7 +2257,7 @@ class Boxes:
                             self.moveTo(x_end, y_end ,0)
                             self.hole(0, 0, 0.5)
 
-                    if shrinkPoly.contains(line_this):
+                    if shrinkTest.contains(line_this):
                         # long segment are cut down further
                         if line_this.length > segment_length[segment_max]:
                             line_working = line_this
@@ -2374,6 +2744,7 @@ class Boxes:
 
         self.move(overallwidth, overallheight, move)
 
+    @memoizedPart
     def rectangularWall(self, x, y, edges="eeee",
                         ignore_widths=[],
                         holesMargin=None, holesSettings=None,
@@ -2566,6 +2937,7 @@ class Boxes:
 
         self.move(overallwidth, overallheight, move, label=label)
 
+    @memoizedPart
     def trapezoidWall(self, w, h0, h1, edges="eeee",
                            callback=None, move=None,
                            label=""):
@@ -2781,6 +3153,7 @@ class Boxes:
         #print(borders)
         return borders
 
+    @memoizedPart
     def polygonWall(self, borders, edge="f", turtle=False,
                     correct_corners=True,
                     callback=None, move=None, label=""):
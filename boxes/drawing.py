@@ -1,9 +1,15 @@
 from __future__ import annotations
 
 import datetime
+import io
 import math
+import zlib
+from array import array
+from contextlib import contextmanager
+from itertools import chain
 from typing import Any
 from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
 
 from affine import Affine
 
@@ -11,6 +17,7 @@ from boxes.extents import Extents
 
 EPS = 1e-4
 PADDING = 10
+NUMPY_MIN_POINTS = 128  # Context.lines() and curves() use NumPy from here on
 
 RANDOMIZE_COLORS = False  # enable to ease check for continuity of paths
 
@@ -28,6 +35,23 @@ def reorder_attributes(root) -> None:
             attrib.update(attribs)
 
 
+# characters ElementTree escapes in attribute values besides &, < and >
+_ATTRIB_ENTITIES = {'"': "&quot;", "\r": "&#13;", "\n": "&#10;", "\t": "&#09;"}
+
+
+def _xml_start(tag, attrib) -> str:
+    """Start tag with sorted attributes as written by ElementTree"""
+    return "<" + tag + "".join(
+        f' {k}="{escape(v, _ATTRIB_ENTITIES)}"' for k, v in sorted(attrib.items()))
+
+
+def _xml_element(tag, text, attrib={}) -> str:
+    """Element without children as written by ElementTree (without tail)"""
+    if text:
+        return f"{_xml_start(tag, attrib)}>{escape(text)}</{tag}>"
+    return _xml_start(tag, attrib) + " />"
+
+
 def points_equal(x1, y1, x2, y2):
     return abs(x1 - x2) < EPS and abs(y1 - y2) < EPS
 
@@ -44,6 +68,7 @@ class Surface:
     invert_y = False
 
     def __init__(self, fname) -> None:
+        """fname is the name of the output file or a binary file object"""
         self._fname = fname
         self.parts: list[Any] = []
         self._p = self.new_part("default")
@@ -52,6 +77,38 @@ class Surface:
     def set_metadata(self, metadata):
         self.metadata = metadata
 
+    def _creation_date(self) -> str:
+        """Date for the meta data - now unless set as "creation_date" """
+        date = self.metadata.get("creation_date") or datetime.datetime.now()
+        return date.strftime("%Y-%m-%d %H:%M:%S")
+
+    @contextmanager
+    def _open(self, encoding=None, errors=None, newline=None):
+        """Open the output for writing
+
+        Returns a text stream if encoding is given and a binary one
+        otherwise. File objects passed instead of a file name are
+        written to but not closed.
+        """
+        if hasattr(self._fname, "write"):
+            f = self._fname
+        else:
+            f = open(self._fname, "wb")
+        try:
+            if encoding:
+                t = io.TextIOWrapper(f, encoding=encoding, errors=errors,
+                                     newline=newline)
+                try:
+                    yield t
+                finally:
+                    t.flush()
+                    t.detach()
+            else:
+                yield f
+        finally:
+            if f is not self._fname:
+                f.close()
+
     def flush(self):
         pass
 
@@ -100,6 +157,21 @@ class Surface:
             raise ValueError("Too many lines")
         self._p.append(*path)
 
+    def lines(self, xy):
+        """Append a line to each of the points in the coordinate buffer xy"""
+        self.count += len(xy) // 2
+        if self.count > 100000:
+            raise ValueError("Too many lines")
+        self._p.path.lines(xy)
+
+    def curves(self, xy, ctrl):
+        """Append a curve to each of the points in the coordinate buffer xy
+        with two control points each from ctrl"""
+        self.count += len(xy) // 2
+        if self.count > 100000:
+            raise ValueError("Too many lines")
+        self._p.path.curves(xy, ctrl)
+
     def stroke(self, **params):
         return self._p.stroke(**params)
 
@@ -115,7 +187,9 @@ class Surface:
 class Part:
     def __init__(self, name) -> None:
         self.pathes: list[Any] = []
-        self.path: list[Any] = []
+        self.path = Path()
+        # index of self.pathes by stroke params and end point
+        self._ends: dict[Any, list[int]] = {}
 
     def extents(self):
         if not self.pathes:
@@ -128,107 +202,441 @@ class Part:
             p.transform(f, m, invert_y)
 
     def append(self, *path):
-        self.path.append(list(path))
+        self.path.append(*path)
 
     def stroke(self, **params):
         if len(self.path) == 0:
             return
         # search for path ending at new start coordinates to append this path to
-        xy0 = self.path[0][1:3]
-        if (not points_equal(*xy0, *self.path[-1][1:3]) and
-            not self.path[0][0] == "T"):
-            for p in reversed(self.pathes):
-                xy1 = p.path[-1][1:3]
-                if points_equal(*xy0, *xy1) and p.params == params:
-                    p.path.extend(self.path[1:])
-                    self.path = []
-                    return p
-        p = Path(self.path, params)
+        xy0 = self.path.start()
+        key = tuple(sorted(params.items()))
+        if (not points_equal(*xy0, *self.path.end()) and
+            not self.path.ops[0] == _T):
+            i = self._find_end(key, *xy0)
+            if i is not None:
+                p = self.pathes[i]
+                self._index_end(key, i, False)
+                p.extend(self.path, 1)
+                self._index_end(key, i)
+                self.path = Path()
+                return p
+        p = self.path
+        p.params = params
         self.pathes.append(p)
-        self.path = []
+        self._index_end(key, len(self.pathes) - 1)
+        self.path = Path()
         return p
 
+    def _index_end(self, key, i, add=True):
+        """Add (or remove) self.pathes[i] to the end point index"""
+        cell = _cell(*self.pathes[i].end())
+        if cell is None:
+            return
+        if add:
+            self._ends.setdefault((key, *cell), []).append(i)
+        else:
+            self._ends[(key, *cell)].remove(i)
+
+    def _find_end(self, key, x, y):
+        """Return index of the last path with params key ending at x, y
+
+        Same result as searching reversed(self.pathes) with points_equal()
+        """
+        cell = _cell(x, y)
+        if cell is None:
+            return None
+        cx, cy = cell
+        found = None
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for i in self._ends.get((key, cx + dx, cy + dy), ()):
+                    if ((found is None or i > found) and
+                        points_equal(x, y, *self.pathes[i].end())):
+                        found = i
+        return found
+
     def move_to(self, *xy):
         if len(self.path) == 0:
-            self.path.append(["M", *xy])
-        elif self.path[-1][0] == "M":
-            self.path[-1] = ["M", *xy]
+            self.path.append("M", *xy)
+        elif self.path.ops[-1] == _M:
+            self.path.xy[-2:] = array("d", xy)
         else:
-            xy0 = self.path[-1][1:3]
+            xy0 = self.path.end()
             if not points_equal(*xy0, *xy):
-                self.path.append(["M", *xy])
+                self.path.append("M", *xy)
+
+
+# op codes of the path commands as stored in Path.ops
+_M, _L, _C, _T = b"MLCT"
+
+# Grid size of the end point index of Part. Twice EPS so that rounding can't
+# put points closer than EPS into cells that are not neighbours.
+_CELL = 2 * EPS
+
+
+def _cell(x, y):
+    try:
+        return math.floor(x / _CELL), math.floor(y / _CELL)
+    except (ValueError, OverflowError):  # nan and inf never equal any point
+        return None
+
+
+def _transform_points(buf, m):
+    """Apply the affine matrix m to all points of the coordinate buffer buf"""
+    a, b, c, d, e, f = m[:6]
+    xs, ys = buf[0::2], buf[1::2]
+    buf[0::2] = array("d", [x * a + y * b + c for x, y in zip(xs, ys)])
+    buf[1::2] = array("d", [x * d + y * e + f for x, y in zip(xs, ys)])
+
+
+# The transformation of the Context is kept as plain tuple (a, b, c, d, e, f)
+# in the order of affine.Affine. Affine objects are only created for the
+# surfaces (see Context.show_text) as they are expensive for every point
+# and turtle step.
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+
+
+def _mul(m, n):
+    """Compose the matrices m and n - n is applied first"""
+    sa, sb, sc, sd, se, sf = m
+    oa, ob, oc, od, oe, of = n
+    return (sa * oa + sb * od, sa * ob + sb * oe, sa * oc + sb * of + sc,
+            sd * oa + se * od, sd * ob + se * oe, sd * oc + se * of + sf)
+
+
+def _translate(m, x, y):
+    """m * Affine.translation(x, y)"""
+    a, b, c, d, e, f = m
+    return (a, b, a * x + b * y + c, d, e, d * x + e * y + f)
+
+
+def _rotation(degrees):
+    """Affine.rotation(degrees) - exact for multiples of 90°"""
+    degrees %= 360.0
+    if degrees == 90.0:
+        ca, sa = 0.0, 1.0
+    elif degrees == 180.0:
+        ca, sa = -1.0, 0.0
+    elif degrees == 270.0:
+        ca, sa = 0.0, -1.0
+    else:
+        rad = math.radians(degrees)
+        ca, sa = math.cos(rad), math.sin(rad)
+    return (ca, -sa, 0.0, sa, ca, 0.0)
+
+
+def _points_array(points, n):
+    """Sequence of n-tuples (or an array) as (len(points), n) array"""
+    import numpy as np
+    if isinstance(points, np.ndarray):
+        return points.astype(float, copy=False).reshape(-1, n)
+    return np.fromiter(chain.from_iterable(points), float,
+                       n * len(points)).reshape(-1, n)
+
+
+def _transform_array(m, p):
+    """Transform the (n, 2) array of points p by the matrix m"""
+    import numpy as np
+    a, b, c, d, e, f = m
+    x, y = p[:, 0], p[:, 1]
+    # same order of operations as in Context to get identical results
+    return np.stack((x * a + y * b + c, x * d + y * e + f), axis=-1)
+
+
+def _lines_array(m, x0, y0, points):
+    """Transformed points as coordinate buffer without the points that
+    don't leave the point before and the last point - for Context.lines()"""
+    import numpy as np
+    mxy = _transform_array(m, _points_array(points, 2))
+    prev = np.concatenate((np.array([[x0, y0]]), mxy[:-1]))
+    keep = (np.abs(mxy - prev) >= EPS).any(axis=1)
+    xy = array("d")
+    xy.frombytes(np.ascontiguousarray(mxy[keep]).tobytes())
+    return xy, mxy[-1]
+
+
+def _curves_array(m, curves):
+    """Transformed curves as coordinate buffers of end and control points
+    - for Context.curves()"""
+    import numpy as np
+    p = _transform_array(m, _points_array(curves, 6).reshape(-1, 2))
+    p = p.reshape(-1, 3, 2)
+    xy, ctrl = array("d"), array("d")
+    xy.frombytes(np.ascontiguousarray(p[:, 2]).tobytes())
+    ctrl.frombytes(np.ascontiguousarray(p[:, :2]).tobytes())
+    return xy, ctrl
 
 
 class Path:
-    def __init__(self, path, params) -> None:
-        self.path = path
+    """Sequence of drawing commands sharing the same stroke parameters
+
+    The commands are stored in compact buffers instead of one Python list
+    per segment:
+
+    * ops: one op code ("M", "L", "C" or "T") per segment
+    * xy: end point of every segment (two floats per segment)
+    * ctrl: the two control points of each "C" segment (four floats each)
+    * texts: [matrix, text, params] of each "T" segment
+
+    Iterating over a Path yields the segments as tuples in the traditional
+    form ("L", x, y), ("C", x, y, x1, y1, x2, y2) or
+    ("T", x, y, matrix, text, params). The path attribute gives the same as
+    a list of lists for code that needs to index into it.
+    """
+
+    def __init__(self, path=(), params=None) -> None:
         self.params = params
+        self.path = path
+
+    @property
+    def path(self):
+        """List form of the commands -- a copy, changes are not written back
+        unless assigned to this attribute again"""
+        return [list(c) for c in self]
+
+    @path.setter
+    def path(self, path):
+        self.ops = bytearray()
+        self.xy = array("d")
+        self.ctrl = array("d")
+        self.texts: list[Any] = []
+        for c in path:
+            self.append(*c)
+
+    def append(self, C, x, y, *args):
+        self.ops.append(ord(C))
+        self.xy.append(x)
+        self.xy.append(y)
+        if C == "C":
+            self.ctrl.extend(args)
+        elif C == "T":
+            self.texts.append(list(args))
+
+    def lines(self, xy):
+        """Append an "L" segment to each point of the coordinate buffer xy"""
+        self.ops += b"L" * (len(xy) // 2)
+        self.xy.extend(xy)
+
+    def curves(self, xy, ctrl):
+        """Append a "C" segment to each point of the coordinate buffer xy
+        with the control points (four floats each) from ctrl"""
+        self.ops += b"C" * (len(xy) // 2)
+        self.xy.extend(xy)
+        self.ctrl.extend(ctrl)
+
+    def extend(self, path, start=0):
+        """Append the segments of another Path beginning with segment start"""
+        self.ops += path.ops[start:]
+        self.xy.extend(path.xy[2*start:])
+        self.ctrl.extend(path.ctrl[4*path.ops.count(_C, 0, start):])
+        self.texts.extend(path.texts[path.ops.count(_T, 0, start):])
+
+    def start(self):
+        return self.xy[0], self.xy[1]
+
+    def end(self):
+        return self.xy[-2], self.xy[-1]
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def __iter__(self):
+        xy, ctrl, texts = self.xy, self.ctrl, self.texts
+        ci = ti = 0
+        for i, op in enumerate(self.ops):
+            x, y = xy[2*i], xy[2*i+1]
+            if op == _C:
+                yield ("C", x, y, *ctrl[ci:ci+4])
+                ci += 4
+            elif op == _T:
+                yield ("T", x, y, *texts[ti])
+                ti += 1
+            else:
+                yield (chr(op), x, y)
 
     def __repr__(self) -> str:
-        l = len(self.path)
-        # x1,y1 = self.path[0][1:3]
+        l = len(self)
         if l>0:
-            x2, y2 = self.path[-1][1:3]
+            x2, y2 = self.end()
             return f"Path[{l}] to ({x2:.2f},{y2:.2f})"
         return f"empty Path"
 
     def extents(self):
-        e = Extents()
-        for p in self.path:
-            e.add(*p[1:3])
-            if p[0] == 'T':
-                m, text, params = p[3:]
-                h = params['fs']
-                l = len(text) * h * 0.7
-                align = params.get('align', 'left')
-                start, end = {
-                    'left' : (0, 1),
-                    'middle' : (-0.5, 0.5),
-                    'end' : (-1, 0),
-                    }[align]
-                for x in (start*l, end*l):
-                    for y in (0, h):
-                        x_, y_ = m * (x, y)
-                        e.add(x_, y_)
+        if not self.ops:
+            return Extents()
+        xs, ys = self.xy[0::2], self.xy[1::2]
+        e = Extents(min(xs), min(ys), max(xs), max(ys))
+        for m, text, params in self.texts:
+            h = params['fs']
+            l = len(text) * h * 0.7
+            align = params.get('align', 'left')
+            start, end = {
+                'left' : (0, 1),
+                'middle' : (-0.5, 0.5),
+                'end' : (-1, 0),
+                }[align]
+            for x in (start*l, end*l):
+                for y in (0, h):
+                    x_, y_ = m * (x, y)
+                    e.add(x_, y_)
         return e
 
     def transform(self, f, m, invert_y=False):
         self.params["lw"] *= f
-        for c in self.path:
-            C = c[0]
-            c[1], c[2] = m * (c[1], c[2])
-            if C == 'C':
-                c[3], c[4] = m * (c[3], c[4])
-                c[5], c[6] = m * (c[5], c[6])
-            if C == "T":
-                c[3] = m * c[3]
-                if invert_y:
-                    c[3] *= Affine.scale(1, -1)
+        _transform_points(self.xy, m)
+        _transform_points(self.ctrl, m)
+        for t in self.texts:
+            t[0] = m * t[0]
+            if invert_y:
+                t[0] *= Affine.scale(1, -1)
 
     def faster_edges(self, inner_corners):
         if inner_corners == "backarc":
             return
 
-        for (i, p) in enumerate(self.path):
-            if p[0] == "C" and i > 1 and i < len(self.path) - 1:
-                if self.path[i - 1][0] == "L" and self.path[i + 1][0] == "L":
-                    p11 = self.path[i - 2][1:3]
-                    p12 = self.path[i - 1][1:3]
-                    p21 = p[1:3]
-                    p22 = self.path[i + 1][1:3]
-                    if (((p12[0]-p21[0])**2 + (p12[1]-p21[1])**2) >
-                        self.params["lw"]**2):
-                        continue
-                    lines_intersect, x, y = line_intersection((p11, p12), (p21, p22))
-                    if lines_intersect:
-                        self.path[i - 1] = ("L", x, y)
-                        if inner_corners == "loop":
-                            self.path[i] = ("C", x, y, *p12, *p21)
-                        else:
-                            self.path[i] =  ("L", x, y)
+        ops, xy, ctrl = self.ops, self.xy, self.ctrl
+        n = len(ops)
+        # offset of the control points of each "C" segment
+        coffs = [0] * n
+        ci = 0
+        for i, op in enumerate(ops):
+            if op == _C:
+                coffs[i] = ci
+                ci += 4
+        # segments changed below never equal unchanged ones when filtering
+        # duplicates
+        changed = bytearray(n)
+
+        for i in range(2, n - 1):
+            if ops[i] == _C and ops[i - 1] == _L and ops[i + 1] == _L:
+                p11 = xy[2*i-4:2*i-2]
+                p12 = xy[2*i-2:2*i]
+                p21 = xy[2*i:2*i+2]
+                p22 = xy[2*i+2:2*i+4]
+                if (((p12[0]-p21[0])**2 + (p12[1]-p21[1])**2) >
+                    self.params["lw"]**2):
+                    continue
+                lines_intersect, x, y = line_intersection((p11, p12), (p21, p22))
+                if lines_intersect:
+                    xy[2*i-2:2*i+2] = array("d", (x, y, x, y))
+                    changed[i - 1] = changed[i] = 1
+                    if inner_corners == "loop":
+                        ctrl[coffs[i]:coffs[i]+4] = p12 + p21
+                    else:
+                        ops[i] = _L
         # filter duplicates
-        if len(self.path) > 1: # no need to find duplicates if only one element in path
-            self.path = [p for n, p in enumerate(self.path) if p != self.path[n-1]]
+        if n > 1: # no need to find duplicates if only one element in path
+            texts = iter(self.texts)
+            segments = []
+            for i, op in enumerate(ops):
+                if op == _C:
+                    extra = tuple(ctrl[coffs[i]:coffs[i]+4])
+                else:
+                    extra = tuple(next(texts)) if op == _T else ()
+                segments.append((op, changed[i], xy[2*i], xy[2*i+1], extra))
+            self.path = [
+                (chr(op), x, y, *extra)
+                for k, (op, _, x, y, extra) in enumerate(segments)
+                if segments[k] != segments[k-1]]
+
+class Recording:
+    """Drawing commands of a Context recorded relative to an origin
+
+    Stands in for the surface while recording. Replaying the commands with
+    a different origin draws the same shape translated.
+    """
+
+    def __init__(self, x0, y0) -> None:
+        self.x0, self.y0 = x0, y0
+        self.commands: list[Any] = []
+        # texts carry their full transformation and can't be moved
+        self.translatable = True
+
+    def move_to(self, x, y):
+        self.commands.append(("M", x - self.x0, y - self.y0))
+
+    def append(self, C, x, y, *args):
+        x0, y0 = self.x0, self.y0
+        if C == "C":
+            x1, y1, x2, y2 = args
+            self.commands.append(("C", x - x0, y - y0, x1 - x0, y1 - y0, x2 - x0, y2 - y0))
+        elif C == "T":
+            self.translatable = False
+            self.commands.append(("T", x - x0, y - y0, *args))
+        else:
+            self.commands.append((C, x - x0, y - y0))
+
+    def lines(self, xy):
+        for i in range(0, len(xy), 2):
+            self.append("L", xy[i], xy[i+1])
+
+    def curves(self, xy, ctrl):
+        for i in range(0, len(xy), 2):
+            self.append("C", xy[i], xy[i+1], *ctrl[2*i:2*i+4])
+
+    def stroke(self, **params):
+        self.commands.append(("S", params))
+
+    def new_part(self, name="part"):
+        self.commands.append(("P", name))
+
+    def replay(self, surface, x0, y0):
+        for c in self.commands:
+            C = c[0]
+            if C == "M":
+                surface.move_to(c[1] + x0, c[2] + y0)
+            elif C == "S":
+                surface.stroke(**c[1])
+            elif C == "P":
+                surface.new_part(c[1])
+            elif C == "C":
+                surface.append("C", c[1] + x0, c[2] + y0, c[3] + x0, c[4] + y0,
+                               c[5] + x0, c[6] + y0)
+            else:
+                surface.append(C, c[1] + x0, c[2] + y0, *c[3:])
+
+
+class LocalRecording(Recording):
+    """Drawing commands of a Context recorded in its user space
+
+    Also keeps the transformation, current point and pen at the end so
+    drawing can continue after replaying with any transformation.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(0.0, 0.0)
+        self.m = IDENTITY
+        self.xy = (0, 0)
+        self.rgb = (0, 0, 0)
+        self.lw = 0
+
+    def replay(self, surface, m):
+        sa, sb, sc, sd, se, sf = m[:6]
+        for c in self.commands:
+            C = c[0]
+            if C == "S":
+                surface.stroke(**c[1])
+                continue
+            if C == "P":
+                surface.new_part(c[1])
+                continue
+            x, y = c[1], c[2]
+            x, y = x * sa + y * sb + sc, x * sd + y * se + sf
+            if C == "M":
+                surface.move_to(x, y)
+            elif C == "C":
+                x1, y1, x2, y2 = c[3:]
+                surface.append("C", x, y,
+                               x1 * sa + y1 * sb + sc, x1 * sd + y1 * se + sf,
+                               x2 * sa + y2 * sb + sc, x2 * sd + y2 * se + sf)
+            elif C == "T":
+                # texts carry their own matrix -- move it along
+                mtext, text, params = c[3:]
+                surface.append("T", x, y, Affine(*m[:6]) * mtext, text, dict(params))
+            else:
+                surface.append(C, x, y)
+
 
 class Context:
     def __init__(self, surface, *al, **ad) -> None:
@@ -238,14 +646,16 @@ class Context:
         self._padding = PADDING
 
         self._stack: list[Any] = []
-        self._m = Affine.translation(0, 0)
+        self._m = IDENTITY
         self._xy = (0, 0)
-        self._mxy = self._m * self._xy
+        self._mxy = (0.0, 0.0)
         self._lw = 0
         self._rgb = (0, 0, 0)
         self._ff = "sans-serif"
         self._fs = 10
         self._last_path = None
+        # state to return to at the end of the local recordings
+        self._recordings: list[Any] = []
 
     def _update_bounds_(self, mx, my):
         self._bounds.update(mx, my)
@@ -269,14 +679,19 @@ class Context:
     ## transformations
 
     def translate(self, x, y):
-        self._m *= Affine.translation(x, y)
+        self._m = _translate(self._m, x, y)
         self._xy = (0, 0)
 
     def scale(self, sx, sy):
-        self._m *= Affine.scale(sx, sy)
+        self._m = _mul(self._m, (sx, 0.0, 0.0, 0.0, sy, 0.0))
 
     def rotate(self, r):
-        self._m *= Affine.rotation(180 * r / math.pi)
+        self._m = _mul(self._m, _rotation(180 * r / math.pi))
+
+    def _transform(self, x, y):
+        """Point x, y in device space"""
+        a, b, c, d, e, f = self._m
+        return (x * a + y * b + c, x * d + y * e + f)
 
     def set_line_width(self, lw):
         self._lw = lw
@@ -290,7 +705,8 @@ class Context:
         self._add_move()
         x1, y1 = self._mxy
         self._xy = x, y
-        x2, y2 = self._mxy = self._m * self._xy
+        a, b, c, d, e, f = self._m
+        x2, y2 = self._mxy = (x * a + y * b + c, x * d + y * e + f)
         if not points_equal(x1, y1, x2, y2):
             self._dwg.append("L", x2, y2)
 
@@ -299,11 +715,67 @@ class Context:
 
     def move_to(self, x, y):
         self._xy = (x, y)
-        self._mxy = self._m * self._xy
+        a, b, c, d, e, f = self._m
+        self._mxy = (x * a + y * b + c, x * d + y * e + f)
 
     def line_to(self, x, y):
         self._line_to(x, y)
 
+    def lines(self, points):
+        """Draw lines through all the points -- same as line_to() for each
+        of them but much faster for long sequences
+
+        Sequences of NUMPY_MIN_POINTS and more are transformed and cleared
+        of the segments line_to() would drop with NumPy in one go.
+        """
+        if len(points) == 0:
+            return
+        self._add_move()
+        if len(points) >= NUMPY_MIN_POINTS:
+            xy, (x1, y1) = _lines_array(self._m, *self._mxy, points)
+        else:
+            a, b, c, d, e, f = self._m
+            # drop the segments line_to() would drop
+            x1, y1 = self._mxy
+            xy = array("d")
+            for x, y in points:
+                x2, y2 = x * a + y * b + c, x * d + y * e + f
+                if abs(x1 - x2) >= EPS or abs(y1 - y2) >= EPS:
+                    xy.append(x2)
+                    xy.append(y2)
+                x1, y1 = x2, y2
+        if xy:
+            self._dwg.lines(xy)
+        x, y = points[-1]
+        self._xy = (float(x), float(y))
+        self._mxy = (float(x1), float(y1))
+
+    def curves(self, curves):
+        """Draw Bézier curves -- same as curve_to(x1, y1, x2, y2, x3, y3)
+        for each of the tuples in curves
+
+        Like curve_to() no curves are dropped. Sequences with
+        NUMPY_MIN_POINTS points and more are transformed with NumPy in one
+        go.
+        """
+        if len(curves) == 0:
+            return
+        if 3 * len(curves) >= NUMPY_MIN_POINTS:
+            xy, ctrl = _curves_array(self._m, curves)
+        else:
+            a, b, c, d, e, f = self._m
+            xy, ctrl = array("d"), array("d")
+            for x1, y1, x2, y2, x3, y3 in curves:
+                xy.append(x3 * a + y3 * b + c)
+                xy.append(x3 * d + y3 * e + f)
+                ctrl.extend((x1 * a + y1 * b + c, x1 * d + y1 * e + f,
+                             x2 * a + y2 * b + c, x2 * d + y2 * e + f))
+        self._add_move()
+        self._dwg.curves(xy, ctrl)
+        x3, y3 = curves[-1][4:6]
+        self._xy = (float(x3), float(y3))
+        self._mxy = (xy[-2], xy[-1])
+
     def _arc(self, xc, yc, radius, angle1, angle2, direction):
         if abs(angle1 - angle2) < EPS or radius < EPS:
             return
@@ -324,11 +796,10 @@ class Context:
         x3 = xc + bx + k2 * by
         y3 = yc + by - k2 * bx
 
-        mx1, my1 = self._m * (x1, y1)
-        mx2, my2 = self._m * (x2, y2)
-        mx3, my3 = self._m * (x3, y3)
-        mx4, my4 = self._m * (x4, y4)
-        mxc, myc = self._m * (xc, yc)
+        a, b, c, d, e, f = self._m
+        mx2, my2 = x2 * a + y2 * b + c, x2 * d + y2 * e + f
+        mx3, my3 = x3 * a + y3 * b + c, x3 * d + y3 * e + f
+        mx4, my4 = x4 * a + y4 * b + c, x4 * d + y4 * e + f
 
         self._add_move()
         self._dwg.append("C", mx4, my4, mx2, my2, mx3, my3)
@@ -342,10 +813,10 @@ class Context:
         self._arc(xc, yc, radius, angle1, angle2, -1)
 
     def curve_to(self, x1, y1, x2, y2, x3, y3):
-        # mx0,my0 = self._m*self._xy
-        mx1, my1 = self._m * (x1, y1)
-        mx2, my2 = self._m * (x2, y2)
-        mx3, my3 = self._m * (x3, y3)
+        a, b, c, d, e, f = self._m
+        mx1, my1 = x1 * a + y1 * b + c, x1 * d + y1 * e + f
+        mx2, my2 = x2 * a + y2 * b + c, x2 * d + y2 * e + f
+        mx3, my3 = x3 * a + y3 * b + c, x3 * d + y3 * e + f
         self._add_move()
         self._dwg.append("C", mx3, my3, mx1, my1, mx2, my2)  # destination first!
         self._xy = (x3, y3)
@@ -371,8 +842,8 @@ class Context:
     def show_text(self, text, **args):
         params = {"ff": self._ff, "fs": self._fs, "lw": self._lw, "rgb": self._rgb}
         params.update(args)
-        mx0, my0 = self._m * self._xy
-        m = self._m
+        m = Affine(*self._m)
+        mx0, my0 = m * self._xy
         self._dwg.append("T", mx0, my0, m, text, params)
 
     def text_extents(self, text):
@@ -404,6 +875,66 @@ class Context:
     def new_part(self):
         self._dwg.new_part()
 
+    @contextmanager
+    def recording(self, x, y):
+        """Record instead of drawing -- relative to the point x, y in
+        user space"""
+        recording = Recording(*self._transform(x, y))
+        dwg = self._dwg
+        self._dwg = recording
+        self.save()
+        try:
+            yield recording
+        finally:
+            self.restore()
+            self._dwg = dwg
+
+    def replay(self, recording, x, y):
+        """Draw recording at the point x, y in user space"""
+        recording.replay(self._dwg, *self._transform(x, y))
+
+    def begin_local_recording(self):
+        """Record instead of drawing -- in the current user space -- until
+        end_local_recording() is called
+
+        Changes of the transformation, current point and pen are recorded
+        too and are undone at the end.
+        """
+        recording = LocalRecording()
+        self._recordings.append((recording, self._dwg, self._m, self._rgb, self._lw))
+        self._dwg = recording
+        self._m = IDENTITY
+        self._mxy = self._xy
+        return recording
+
+    def end_local_recording(self):
+        """Stop the recording begun last and return it"""
+        recording, dwg, m, rgb, lw = self._recordings.pop()
+        recording.m, recording.xy = self._m, self._xy
+        recording.rgb, recording.lw = self._rgb, self._lw
+        self._dwg, self._m, self._rgb, self._lw = dwg, m, rgb, lw
+        self._mxy = self._transform(*self._xy)
+        return recording
+
+    @contextmanager
+    def local_recording(self):
+        """Record instead of drawing within the with block -- see
+        begin_local_recording()"""
+        recording = self.begin_local_recording()
+        try:
+            yield recording
+        finally:
+            self.end_local_recording()
+
+    def replay_local(self, recording):
+        """Draw a LocalRecording in the current user space and continue
+        where it ended"""
+        recording.replay(self._dwg, self._m)
+        self._m = _mul(self._m, recording.m)
+        self._xy = recording.xy
+        self._mxy = self._transform(*self._xy)
+        self._rgb, self._lw = recording.rgb, recording.lw
+
 
 class SVGSurface(Surface):
 
@@ -415,6 +946,21 @@ class SVGSurface(Surface):
         'monospaced' : '"Courier New", Courier, "Lucida Sans Typewriter"'
     }
 
+    # write the file while walking the parts instead of building an
+    # ElementTree first. Set to False to use the ElementTree writer.
+    streaming = True
+
+    nsmap = {
+        "dc": "http://purl.org/dc/elements/1.1/",
+        "cc": "http://creativecommons.org/ns#",
+        "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+        "svg": "http://www.w3.org/2000/svg",
+        "xlink": "http://www.w3.org/1999/xlink",
+        "inkscape": "http://www.inkscape.org/namespaces/inkscape",
+    }
+
+    group_style = "fill:none;stroke-linecap:round;stroke-linejoin:round;"
+
     def _addTag(self, parent, tag, text, first=False):
         if first:
             t = ET.Element(tag)
@@ -426,30 +972,20 @@ class SVGSurface(Surface):
             parent.insert(0, t)
         return t
 
-    def _add_metadata(self, root):
+    def _metadata(self):
+        """Return XML comment, title and (tag, text) pairs of the rdf meta data"""
         md = self.metadata
 
-        # Add Inkscape style rdf meta data
-        root.set("xmlns:dc", "http://purl.org/dc/elements/1.1/")
-        root.set("xmlns:cc", "http://creativecommons.org/ns#")
-        root.set("xmlns:rdf","http://www.w3.org/1999/02/22-rdf-syntax-ns#")
-
         title = "{group} - {name}".format(**md)
-        date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        date = self._creation_date()
 
-        m = self._addTag(root, "metadata", '\n', True)
-        r = ET.SubElement(m, 'rdf:RDF')
-        w = ET.SubElement(r, 'cc:Work')
-        w.text = '\n'
-
-        self._addTag(w, 'dc:title', title)
-        self._addTag(w, 'dc:date', date)
+        rdf = [('dc:title', title), ('dc:date', date)]
 
         if "url" in md and md["url"]:
-            self._addTag(w, 'dc:source', md["url"])
-            self._addTag(w, 'dc:source', md["url_short"])
+            rdf.append(('dc:source', md["url"]))
+            rdf.append(('dc:source', md["url_short"]))
         else:
-            self._addTag(w, 'dc:source', md["cli"])
+            rdf.append(('dc:source', md["cli"]))
 
         desc = md["short_description"] or ""
         if "description" in md and md["description"]:
@@ -462,12 +998,9 @@ class SVGSurface(Surface):
             desc += "Url short: %s\n" % md["url_short"]
             desc += "SettingsUrl: %s\n" % md["url"].replace("&render=1", "")
             desc += "SettingsUrl short: %s\n" % md["url_short"].replace("&render=1", "")
-        self._addTag(w, 'dc:description', desc)
-
-        # title
-        self._addTag(root, "title", md["name"], True)
+        rdf.append(('dc:description', desc))
 
-        # Add XML comment
+        # XML comment
         txt = """
 {name} - {short_description}
 """.format(**md)
@@ -489,109 +1022,185 @@ Creation date: {date}
             txt += "Url short: %s\n" % md["url_short"]
             txt += "SettingsUrl: %s\n" % md["url"].replace("&render=1", "")
             txt += "SettingsUrl short: %s\n" % md["url_short"].replace("&render=1", "")
-        m = ET.Comment(txt.replace("--", "- -").replace("--", "- -")) # ----
+        comment = txt.replace("--", "- -").replace("--", "- -") # ----
+
+        return comment, md["name"], rdf
+
+    def _add_metadata(self, root):
+        comment, title, rdf = self._metadata()
+
+        # Add Inkscape style rdf meta data
+        root.set("xmlns:dc", "http://purl.org/dc/elements/1.1/")
+        root.set("xmlns:cc", "http://creativecommons.org/ns#")
+        root.set("xmlns:rdf","http://www.w3.org/1999/02/22-rdf-syntax-ns#")
+
+        m = self._addTag(root, "metadata", '\n', True)
+        r = ET.SubElement(m, 'rdf:RDF')
+        w = ET.SubElement(r, 'cc:Work')
+        w.text = '\n'
+
+        for tag, text in rdf:
+            self._addTag(w, tag, text)
+
+        # title
+        self._addTag(root, "title", title, True)
+
+        # Add XML comment
+        m = ET.Comment(comment)
         m.tail = '\n'
         root.insert(0, m)
 
-    def finish(self, inner_corners="loop"):
-        extents = self._adjust_coordinates()
+    def _svg_attributes(self, extents):
         w = extents.width * self.scale
         h = extents.height * self.scale
+        attrib = {"width": f"{w:.2f}mm", "height": f"{h:.2f}mm",
+                  "viewBox": f"0.0 0.0 {w:.2f} {h:.2f}",
+                  "xmlns": "http://www.w3.org/2000/svg"}
+        for name, value in self.nsmap.items():
+            attrib[f"xmlns:{name}"] = value
+        return attrib
+
+    def _path_elements(self, path, inner_corners):
+        """Return the text elements as (attributes, text) pairs, the path data
+        and the stroke color of path"""
+        p = []
+        texts = []
+        x, y = 0, 0
+        start = None
+        last = None
+        path.faster_edges(inner_corners)
+        for c in path:
+            x0, y0 = x, y
+            C, x, y = c[0:3]
+            if C == "M":
+                if start and points_equal(start[1], start[2],
+                                          last[1], last[2]):
+                    p.append("Z")
+                start = c
+                p.append(f"M {x:.3f} {y:.3f}")
+            elif C == "L":
+                if abs(x - x0) < EPS:
+                    p.append(f"V {y:.3f}")
+                elif abs(y - y0) < EPS:
+                    p.append(f"H {x:.3f}")
+                else:
+                    p.append(f"L {x:.3f} {y:.3f}")
+            elif C == "C":
+                x1, y1, x2, y2 = c[3:]
+                p.append(
+                    f"C {x1:.3f} {y1:.3f} {x2:.3f} {y2:.3f} {x:.3f} {y:.3f}"
+                )
+            elif C == "T":
+                m, text, params = c[3:]
+                m = m * Affine.translation(0, -params['fs'])
+                tm = " ".join(f"{m[i]:.3f}" for i in (0, 3, 1, 4, 2, 5))
+                font, bold, italic = params['ff']
+                fontweight = ("normal", "bold")[bool(bold)]
+                fontstyle = ("normal", "italic")[bool(italic)]
+
+                style = f"font-family: {font} ; font-weight: {fontweight}; font-style: {fontstyle}; fill: {rgb_to_svg_color(*params['rgb'])}"
+                texts.append(({
+                    #"x": f"{x:.3f}", "y": f"{y:.3f}",
+                    "transform": f"matrix( {tm} )",
+                    "style": style,
+                    "font-size": f"{params['fs']}px",
+                    "text-anchor": params.get('align', 'left'),
+                    "dominant-baseline": 'hanging'}, text))
+            else:
+                print("Unknown", c)
+
+            last = c
+
+        if start and start is not last and \
+           points_equal(start[1], start[2], last[1], last[2]):
+            p.append("Z")
+        color = (
+            random_svg_color()
+            if RANDOMIZE_COLORS
+            else rgb_to_svg_color(*path.params["rgb"])
+        )
+        if p and p[-1][0] == "M":
+            p.pop()
+        return texts, " ".join(p), color
+
+    def finish(self, inner_corners="loop"):
+        if self.streaming:
+            self._finish_stream(inner_corners)
+        else:
+            self._finish_etree(inner_corners)
+
+    def _finish_stream(self, inner_corners):
+        """Write the SVG file directly. Output is identical to _finish_etree()"""
+        extents = self._adjust_coordinates()
 
+        with self._open("utf-8", "xmlcharrefreplace", "\n") as f:
+            write = f.write
+            write("<?xml version='1.0' encoding='utf-8'?>\n")
+            write(_xml_start("svg", self._svg_attributes(extents)) + ">\n")
+
+            comment, title, rdf = self._metadata()
+            write(f"<!--{comment}-->\n")
+            write(_xml_element("title", title) + "\n")
+            write("<metadata>\n<rdf:RDF><cc:Work>\n")
+            for tag, text in rdf:
+                write(_xml_element(tag, text) + "\n")
+            write("</cc:Work></rdf:RDF></metadata>\n")
+
+            for i, part in enumerate(self.parts):
+                if not part.pathes:
+                    continue
+                write(_xml_start("g", {"id": f"p-{i}", "style": self.group_style}) + ">\n  ")
+                # elements are written when the next one shows up as the
+                # last one in the group gets a different tail
+                pending = None
+                for j, path in enumerate(part.pathes):
+                    texts, d, color = self._path_elements(path, inner_corners)
+                    for attrib, text in texts:
+                        if pending:
+                            write(pending[0] + pending[1])
+                        pending = (_xml_element("text", text, attrib), "")
+                    if d:  # might be empty if only contains text
+                        if pending:
+                            write(pending[0] + pending[1])
+                        pending = (_xml_element(
+                            "path", None, {"d": d, "stroke": color,
+                                           "stroke-width": f'{path.params["lw"]:.2f}'}),
+                                   "\n  ")
+                if pending:
+                    write(pending[0] + "\n")
+                write("</g>\n")
+            write("</svg>")
+
+    def _finish_etree(self, inner_corners):
+        extents = self._adjust_coordinates()
 
-        nsmap = {
-                "dc": "http://purl.org/dc/elements/1.1/",
-                "cc": "http://creativecommons.org/ns#",
-                "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
-                "svg": "http://www.w3.org/2000/svg",
-                "xlink": "http://www.w3.org/1999/xlink",
-                "inkscape": "http://www.inkscape.org/namespaces/inkscape",
-            }
         ET.register_namespace("", "http://www.w3.org/2000/svg")
         ET.register_namespace("xlink", "http://www.w3.org/1999/xlink")
-        svg = ET.Element('svg', width=f"{w:.2f}mm", height=f"{h:.2f}mm",
-                         viewBox=f"0.0 0.0 {w:.2f} {h:.2f}",
-                         xmlns="http://www.w3.org/2000/svg")
-        for name, value in nsmap.items():
-            svg.set(f"xmlns:{name}", value)
+        svg = ET.Element('svg', self._svg_attributes(extents))
         svg.text = "\n"
         tree = ET.ElementTree(svg)
 
         self._add_metadata(svg)
-        
+
         for i, part in enumerate(self.parts):
             if not part.pathes:
                 continue
             g = ET.SubElement(svg, "g", id=f"p-{i}",
-                              style="fill:none;stroke-linecap:round;stroke-linejoin:round;")
+                              style=self.group_style)
             g.text = "\n  "
             g.tail = "\n"
             for j, path in enumerate(part.pathes):
-                p = []
-                x, y = 0, 0
-                start = None
-                last = None
-                path.faster_edges(inner_corners)
-                for c in path.path:
-                    x0, y0 = x, y
-                    C, x, y = c[0:3]
-                    if C == "M":
-                        if start and points_equal(start[1], start[2],
-                                                  last[1], last[2]):
-                            p.append("Z")
-                        start = c
-                        p.append(f"M {x:.3f} {y:.3f}")
-                    elif C == "L":
-                        if abs(x - x0) < EPS:
-                            p.append(f"V {y:.3f}")
-                        elif abs(y - y0) < EPS:
-                            p.append(f"H {x:.3f}")
-                        else:
-                            p.append(f"L {x:.3f} {y:.3f}")
-                    elif C == "C":
-                        x1, y1, x2, y2 = c[3:]
-                        p.append(
-                            f"C {x1:.3f} {y1:.3f} {x2:.3f} {y2:.3f} {x:.3f} {y:.3f}"
-                        )
-                    elif C == "T":
-                        m, text, params = c[3:]
-                        m = m * Affine.translation(0, -params['fs'])
-                        tm = " ".join(f"{m[i]:.3f}" for i in (0, 3, 1, 4, 2, 5))
-                        font, bold, italic = params['ff']
-                        fontweight = ("normal", "bold")[bool(bold)]
-                        fontstyle = ("normal", "italic")[bool(italic)]
-
-                        style = f"font-family: {font} ; font-weight: {fontweight}; font-style: {fontstyle}; fill: {rgb_to_svg_color(*params['rgb'])}"
-                        t = ET.SubElement(g, "text",
-                                          #x=f"{x:.3f}", y=f"{y:.3f}",
-                                          transform=f"matrix( {tm} )",
-                                          style=style)
-                        t.text = text
-                        t.set("font-size", f"{params['fs']}px")
-                        t.set("text-anchor", params.get('align', 'left'))
-                        t.set("dominant-baseline", 'hanging')
-                    else:
-                        print("Unknown", c)
-
-                    last = c
-
-                if start and start is not last and \
-                   points_equal(start[1], start[2], last[1], last[2]):
-                    p.append("Z")
-                color = (
-                    random_svg_color()
-                    if RANDOMIZE_COLORS
-                    else rgb_to_svg_color(*path.params["rgb"])
-                )
-                if p and p[-1][0] == "M":
-                    p.pop()
-                if p:  # might be empty if only contains text
-                    t = ET.SubElement(g, "path", d=" ".join(p), stroke=color)
+                texts, d, color = self._path_elements(path, inner_corners)
+                for attrib, text in texts:
+                    t = ET.SubElement(g, "text", attrib)
+                    t.text = text
+                if d:  # might be empty if only contains text
+                    t = ET.SubElement(g, "path", d=d, stroke=color)
                     t.set("stroke-width", f'{path.params["lw"]:.2f}')
                     t.tail = "\n  "
             t.tail = "\n"
         reorder_attributes(tree)
-        with open(self._fname, "wb") as f:
+        with self._open() as f:
             tree.write(f, encoding="utf-8", xml_declaration=True, method="xml")
 
 class PSSurface(Surface):
@@ -618,7 +1227,7 @@ class PSSurface(Surface):
 
         desc = ""
         desc += "%%Title: Boxes.py - {group} - {name}\n".format(**md)
-        desc += f'%%CreationDate: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n'
+        desc += f'%%CreationDate: {self._creation_date()}\n'
         desc += f'%%Keywords: boxes.py, laser, laser cutter\n'
         desc += f'%%Creator: {md.get("url") or md["cli"]}\n'
         desc +=  "%%CreatedBy: Boxes.py (https://festi.info/boxes.py)\n"
@@ -646,9 +1255,8 @@ class PSSurface(Surface):
         w = extents.width
         h = extents.height
 
-        f = open(self._fname, "w", encoding="latin1", errors="replace")
-
-        f.write(f"""%!PS-Adobe-2.0 EPSF-2.0
+        with self._open("latin1", "replace") as f:
+            f.write(f"""%!PS-Adobe-2.0 EPSF-2.0
 %%BoundingBox: 0 0 {w:.0f} {h:.0f}
 {self._metadata()}
 %%EndComments
@@ -657,7 +1265,7 @@ class PSSurface(Surface):
 1 setlinejoin
 0.0 0.0 0.0 setrgbcolor
 """)
-        f.write("""
+            f.write("""
 /ReEncode { % inFont outFont encoding | -
    /MyEncoding exch def
    exch findfont
@@ -671,82 +1279,265 @@ class PSSurface(Surface):
 } def
 
 """)
-        for font in self.fonts.values():
-            f.write(f"/{font} /{font}-Latin1 ISOLatin1Encoding ReEncode\n")
-        # f.write(f"%%DocumentMedia: \d+x\d+mm ((\d+) (\d+)) 0 \("
-        # dwg['width']=f'{w:.2f}mm'
-        # dwg['height']=f'{h:.2f}mm'
+            for font in self.fonts.values():
+                f.write(f"/{font} /{font}-Latin1 ISOLatin1Encoding ReEncode\n")
+            # f.write(f"%%DocumentMedia: \d+x\d+mm ((\d+) (\d+)) 0 \("
+            # dwg['width']=f'{w:.2f}mm'
+            # dwg['height']=f'{h:.2f}mm'
+
+            for i, part in enumerate(self.parts):
+                if not part.pathes:
+                    continue
+                for j, path in enumerate(part.pathes):
+                    p = []
+                    x, y = 0, 0
+                    path.faster_edges(inner_corners)
+
+                    for c in path:
+                        x0, y0 = x, y
+                        C, x, y = c[0:3]
+                        if C == "M":
+                            p.append(f"{x:.3f} {y:.3f} moveto")
+                        elif C == "L":
+                            p.append(f"{x:.3f} {y:.3f} lineto")
+                        elif C == "C":
+                            x1, y1, x2, y2 = c[3:]
+                            p.append(
+                                f"{x1:.3f} {y1:.3f} {x2:.3f} {y2:.3f} {x:.3f} {y:.3f} curveto"
+                            )
+                        elif C == "T":
+                            m, text, params = c[3:]
+                            tm = " ".join(f"{m[i]:.3f}" for i in (0, 3, 1, 4, 2, 5))
+                            text = text.replace("(", r"\(").replace(")", r"\)")
+                            color = " ".join(f"{c:.2f}" for c in params["rgb"])
+                            align = params.get('align', 'left')
+                            f.write(f"/{self.fonts[params['ff']]}-Latin1 findfont\n")
+                            f.write(f"{params['fs']} scalefont\n")
+                            f.write("setfont\n")
+                            #f.write(f"currentfont /Encoding  ISOLatin1Encoding put\n")
+                            f.write(f"{color} setrgbcolor\n")
+                            f.write("matrix currentmatrix") # save current matrix
+                            f.write(f"[ {tm} ] concat\n")
+                            if align == "left":
+                                f.write(f"0.0\n")
+                            else:
+                                f.write(f"({text}) stringwidth pop ")
+                                if align == "middle":
+                                    f.write(f"-0.5 mul\n")
+                                else: # end
+                                    f.write(f"neg\n")
+                            # offset y by descender
+                            f.write("currentfont dup /FontBBox get 1 get \n")
+                            f.write("exch /FontMatrix get 3 get mul neg moveto \n")
+
+                            f.write(f"({text}) show\n") # text created by dup above
+                            f.write("setmatrix\n\n") # restore matrix
+                        else:
+                            print("Unknown", c)
+                    color = (
+                        random_svg_color()
+                        if RANDOMIZE_COLORS
+                        else rgb_to_svg_color(*path.params["rgb"])
+                    )
+                    if p:  # todo: might be empty since text is not implemented yet
+                        color = " ".join(f"{c:.2f}" for c in path.params["rgb"])
+                        f.write("newpath\n")
+                        f.write("\n".join(p))
+                        f.write("\n")
+                        f.write(f"{path.params['lw']} setlinewidth\n")
+                        f.write(f"{color} setrgbcolor\n")
+                        f.write("stroke\n\n")
+            f.write(
+                """
+showpage
+%%Trailer
+%%EOF
+"""
+            )
 
-        for i, part in enumerate(self.parts):
-            if not part.pathes:
-                continue
-            for j, path in enumerate(part.pathes):
+class PDFSurface(PSSurface):
+    """Writes PDF without external tools
+
+    Uses the standard Type1 fonts of PSSurface.fonts. As those are not
+    embedded text widths (for aligning) come from the tables below.
+    """
+
+    compress = True  # deflate the content stream
+
+    # AFM widths of the characters 32 to 126. Italic variants use the
+    # widths of the upright fonts (exact for Helvetica and Courier)
+    widths = {
+        "Helvetica": [
+            278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+            556, 556, 556, 556, 556, 556, 556, 556, 556, 556,
+            278, 278, 584, 584, 584, 556, 1015,
+            667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833,
+            722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611,
+            278, 278, 278, 469, 556, 333,
+            556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833,
+            556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500,
+            334, 260, 334, 584],
+        "Helvetica-Bold": [
+            278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+            556, 556, 556, 556, 556, 556, 556, 556, 556, 556,
+            333, 333, 584, 584, 584, 611, 975,
+            722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833,
+            722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611,
+            333, 278, 333, 584, 556, 333,
+            556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889,
+            611, 611, 611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500,
+            389, 280, 389, 584],
+        "Times-Roman": [
+            250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278,
+            500, 500, 500, 500, 500, 500, 500, 500, 500, 500,
+            278, 278, 564, 564, 564, 444, 921,
+            722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889,
+            722, 722, 556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611,
+            333, 278, 333, 469, 500, 333,
+            444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778,
+            500, 500, 500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444,
+            480, 200, 480, 541],
+        "Times-Bold": [
+            250, 333, 555, 500, 500, 1000, 833, 278, 333, 333, 500, 570, 250, 333, 250, 278,
+            500, 500, 500, 500, 500, 500, 500, 500, 500, 500,
+            333, 333, 570, 570, 570, 500, 930,
+            722, 667, 722, 722, 667, 611, 778, 778, 389, 500, 778, 667, 944,
+            722, 778, 611, 778, 722, 556, 667, 722, 722, 1000, 722, 722, 667,
+            333, 278, 333, 581, 500, 333,
+            500, 556, 444, 556, 444, 333, 500, 556, 278, 333, 556, 278, 833,
+            556, 500, 556, 556, 444, 389, 333, 556, 500, 722, 500, 500, 444,
+            394, 220, 394, 520],
+        "Courier": [600] * 95,
+        }
+    widths["Courier-Bold"] = widths["Courier"]
+
+    # lower end of the FontBBox
+    descender = {
+        "Helvetica": -225,
+        "Helvetica-Bold": -228,
+        "Times-Roman": -218,
+        "Times-Bold": -218,
+        "Courier": -250,
+        "Courier-Bold": -250,
+        }
+
+    @staticmethod
+    def _upright(font):
+        for italic, upright in (("-BoldOblique", "-Bold"), ("-Oblique", ""),
+                                ("-BoldItalic", "-Bold"), ("-Italic", "-Roman")):
+            if font.endswith(italic):
+                return font[:-len(italic)] + upright
+        return font
+
+    def _text_width(self, font, text):
+        """Width of text in 1/1000 of the font size"""
+        widths = self.widths[self._upright(font)]
+        default = widths[ord("n") - 32]
+        return sum(widths[ord(c) - 32] if 32 <= ord(c) < 127 else default
+                   for c in text)
+
+    def _info(self):
+        md = self.metadata
+        desc = md["short_description"] or ""
+        if md.get("description"):
+            desc += "\n\n" + md["description"]
+        date = "".join(c for c in self._creation_date() if c.isdigit())
+        return {
+            "Title": "Boxes.py - {group} - {name}".format(**md),
+            "Subject": desc,
+            "Keywords": "boxes.py, laser, laser cutter",
+            "Creator": md.get("url") or md["cli"],
+            "Producer": "Boxes.py (https://festi.info/boxes.py)",
+            "CreationDate": f"D:{date}",
+        }
+
+    def finish(self, inner_corners="loop"):
+        extents = self._adjust_coordinates()
+        fonts: dict[str, str] = {}
+        content = ["1 J 1 j\n"]
+
+        for part in self.parts:
+            for path in part.pathes:
                 p = []
-                x, y = 0, 0
                 path.faster_edges(inner_corners)
-
-                for c in path.path:
-                    x0, y0 = x, y
+                for c in path:
                     C, x, y = c[0:3]
                     if C == "M":
-                        p.append(f"{x:.3f} {y:.3f} moveto")
+                        p.append(f"{x:.3f} {y:.3f} m")
                     elif C == "L":
-                        p.append(f"{x:.3f} {y:.3f} lineto")
+                        p.append(f"{x:.3f} {y:.3f} l")
                     elif C == "C":
                         x1, y1, x2, y2 = c[3:]
                         p.append(
-                            f"{x1:.3f} {y1:.3f} {x2:.3f} {y2:.3f} {x:.3f} {y:.3f} curveto"
+                            f"{x1:.3f} {y1:.3f} {x2:.3f} {y2:.3f} {x:.3f} {y:.3f} c"
                         )
                     elif C == "T":
                         m, text, params = c[3:]
+                        font = self.fonts[params['ff']]
+                        name = fonts.setdefault(font, f"F{len(fonts) + 1}")
+                        fs = params['fs']
                         tm = " ".join(f"{m[i]:.3f}" for i in (0, 3, 1, 4, 2, 5))
-                        text = text.replace("(", r"\(").replace(")", r"\)")
                         color = " ".join(f"{c:.2f}" for c in params["rgb"])
                         align = params.get('align', 'left')
-                        f.write(f"/{self.fonts[params['ff']]}-Latin1 findfont\n")
-                        f.write(f"{params['fs']} scalefont\n")
-                        f.write("setfont\n")
-                        #f.write(f"currentfont /Encoding  ISOLatin1Encoding put\n")
-                        f.write(f"{color} setrgbcolor\n")
-                        f.write("matrix currentmatrix") # save current matrix
-                        f.write(f"[ {tm} ] concat\n")
-                        if align == "left":
-                            f.write(f"0.0\n")
-                        else:
-                            f.write(f"({text}) stringwidth pop ")
+                        dx = 0.0
+                        if align != "left":
+                            dx = -self._text_width(font, text) * fs / 1000
                             if align == "middle":
-                                f.write(f"-0.5 mul\n")
-                            else: # end
-                                f.write(f"neg\n")
+                                dx *= 0.5
                         # offset y by descender
-                        f.write("currentfont dup /FontBBox get 1 get \n")
-                        f.write("exch /FontMatrix get 3 get mul neg moveto \n")
-
-                        f.write(f"({text}) show\n") # text created by dup above
-                        f.write("setmatrix\n\n") # restore matrix
+                        dy = -self.descender[self._upright(font)] * fs / 1000
+                        content.append(
+                            f"{color} rg\nBT\n/{name} {fs} Tf\n{tm} Tm\n"
+                            f"{dx:.3f} {dy:.3f} Td\n{_pdf_string(text)} Tj\nET\n")
                     else:
                         print("Unknown", c)
-                color = (
-                    random_svg_color()
-                    if RANDOMIZE_COLORS
-                    else rgb_to_svg_color(*path.params["rgb"])
-                )
-                if p:  # todo: might be empty since text is not implemented yet
+                if p:
                     color = " ".join(f"{c:.2f}" for c in path.params["rgb"])
-                    f.write("newpath\n")
-                    f.write("\n".join(p))
-                    f.write("\n")
-                    f.write(f"{path.params['lw']} setlinewidth\n")
-                    f.write(f"{color} setrgbcolor\n")
-                    f.write("stroke\n\n")
-        f.write(
-            """
-showpage
-%%Trailer
-%%EOF
-"""
-        )
-        f.close()
+                    content.append(f"{color} RG\n{path.params['lw']} w\n")
+                    content.append("\n".join(p))
+                    content.append("\nS\n")
+
+        stream = "".join(content).encode("latin1")
+        filters = ""
+        if self.compress:
+            stream = zlib.compress(stream)
+            filters = " /Filter /FlateDecode"
+
+        # object numbers: 1 catalog, 2 pages, 3 page, 4 content, 5 info, fonts
+        font_refs = " ".join(f"/{name} {i} 0 R"
+                             for i, name in enumerate(fonts.values(), 6))
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {extents.width:.3f} {extents.height:.3f}] "
+            f"/Resources << /Font << {font_refs} >> >> /Contents 4 0 R >>".encode("latin1"),
+            f"<< /Length {len(stream)}{filters} >>\nstream\n".encode("latin1") +
+            stream + b"\nendstream",
+            ("<< " + " ".join(f"/{k} {_pdf_string(v)}" for k, v in self._info().items()) +
+             " >>").encode("latin1", "replace"),
+        ]
+        for font in fonts:
+            objects.append(f"<< /Type /Font /Subtype /Type1 /BaseFont /{font} "
+                           "/Encoding /WinAnsiEncoding >>".encode("latin1"))
+
+        with self._open() as f:
+            pos = f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            offsets = []
+            for i, obj in enumerate(objects, 1):
+                offsets.append(pos)
+                pos += f.write(b"%i 0 obj\n%s\nendobj\n" % (i, obj))
+            f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin1"))
+            f.write("".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin1"))
+            f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info 5 0 R >>\n"
+                    f"startxref\n{pos}\n%%EOF\n".encode("latin1"))
+
+
+def _pdf_string(text):
+    """Return text as PDF string literal in WinAnsiEncoding"""
+    text = text.encode("cp1252", "replace").decode("latin1")
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return "(" + text.replace("\r", "\\r").replace("\n", "\\n") + ")"
+
 
 class LBRN2Surface(Surface):
 
@@ -847,21 +1638,22 @@ class LBRN2Surface(Surface):
                 path.faster_edges(inner_corners)
                 num = 0
                 cnt = 1
-                end = len(path.path) - 1
+                segments = list(path)
+                end = len(segments) - 1
                 if self.dbg:
-                    for c in path.path:
+                    for c in segments:
                         print ("6",num, c)
                         num += 1
                     num = 0
                     
-                c = path.path[num]
+                c = segments[num]
                 C, x, y = c[0:3]
                 if self.dbg:
                     print("end:", end)
-                while num < end or (C == "T" and num <= end):  # len(path.path):
+                while num < end or (C == "T" and num <= end):  # len(segments):
                     if self.dbg:
                         print("0", num)
-                    c = path.path[num]
+                    c = segments[num]
                     if self.dbg: print("first: ", num, c)
 
                     C, x, y = c[0:3]
@@ -881,9 +1673,9 @@ class LBRN2Surface(Surface):
                         # do something with M
                         done = False
                         bspline = False
-                        while done == False and num < end:  # len(path.path):
+                        while done == False and num < end:  # len(segments):
                             num += 1
-                            c = path.path[num]
+                            c = segments[num]
                             if self.dbg: print ("next: ",num, c)
                             C, x, y = c[0:3]
                             if C == "M":
@@ -998,9 +1790,448 @@ class LBRN2Surface(Surface):
         pl.tail = "\n"
 
         if self.dbg: print ("5", num)
-        with open(self._fname, "wb") as f:
+        with self._open() as f:
             tree.write(f, encoding="utf-8", xml_declaration=True, method="xml")
 
+class DXFSurface(Surface):
+    """Writes DXF (AutoCAD R2000) without external tools
+
+    Straight lines and arcs become LWPOLYLINEs (arcs as bulges), all other
+    curves SPLINEs and texts TEXT entities. Each color gets its own layer.
+    """
+
+    # name and AutoCAD color index of the colors in boxes.Color
+    # indexed by 4*r + 2*g + b like LBRN2Surface.lbrn2_colors
+    layers = [
+        ("BLACK", 7),  # shown white on dark background
+        ("BLUE", 5),
+        ("GREEN", 3),
+        ("CYAN", 4),
+        ("RED", 1),
+        ("MAGENTA", 6),
+        ("YELLOW", 2),
+        ("WHITE", 7),
+        ]
+
+    # like Context.text_extents()
+    text_height = 0.65
+
+    def _metadata(self):
+        md = self.metadata
+        lines = [
+            "Boxes.py - {group} - {name}".format(**md),
+            f"Created: {self._creation_date()}",
+            "Created with Boxes.py (https://festi.info/boxes.py)",
+            "Command line: %s" % md["cli"],
+            "Command line short: %s" % md["cli_short"],
+        ]
+        if md["url"]:
+            lines.append("Url: %s" % md["url"])
+            lines.append("Url short: %s" % md["url_short"])
+        return "".join(f"999\n{_dxf_text(line)}\n" for line in lines)
+
+    def _layer(self, layers, rgb):
+        i = 4 * int(rgb[0]) + 2 * int(rgb[1]) + int(rgb[2])
+        name, aci = self.layers[i]
+        if [float(c) for c in rgb] != [i >> 2 & 1, i >> 1 & 1, i & 1]:
+            name = "RGB_%02X%02X%02X" % tuple(round(255 * c) for c in rgb)
+        if name not in layers:
+            r, g, b = (round(255 * c) for c in rgb)
+            layers[name] = (aci, (r << 16) + (g << 8) + b)
+        return name
+
+    def finish(self, inner_corners="loop"):
+        extents = self._adjust_coordinates()
+        handles = iter(range(0x100, 1 << 32))
+        layers: dict[str, tuple[int, int]] = {}
+        entities = []
+
+        def entity(kind, layer, *groups):
+            entities.append(f"  0\n{kind}\n  5\n{next(handles):X}\n"
+                            f"100\nAcDbEntity\n  8\n{layer}\n")
+            entities.extend(f"{code:>3}\n{value}\n" for code, value in groups)
+
+        def polyline(vertices, layer):
+            if len(vertices) < 2:
+                return
+            closed = len(vertices) > 2 and points_equal(
+                *vertices[0][:2], *vertices[-1][:2])
+            if closed:
+                vertices = vertices[:-1]
+            groups = [(100, "AcDbPolyline"), (90, len(vertices)),
+                      (70, int(closed))]
+            for x, y, bulge in vertices:
+                groups.append((10, f"{x:.3f}"))
+                groups.append((20, f"{y:.3f}"))
+                if bulge:
+                    groups.append((42, f"{bulge:.6f}"))
+            entity("LWPOLYLINE", layer, *groups)
+
+        for part in self.parts:
+            for path in part.pathes:
+                layer = self._layer(layers, path.params["rgb"])
+                path.faster_edges(inner_corners)
+                vertices: list[list[float]] = []
+                x, y = 0, 0
+                for c in path:
+                    C = c[0]
+                    if C == "T":
+                        m, text, params = c[3:]
+                        fs = params["fs"] * math.hypot(m.a, m.d)
+                        align = {"middle": 1, "end": 2}.get(
+                            params.get("align", "left"), 0)
+                        x0, y0 = m.c, m.f
+                        entity("TEXT", self._layer(layers, params["rgb"]),
+                               (100, "AcDbText"),
+                               (10, f"{x0:.3f}"), (20, f"{y0:.3f}"), (30, 0.0),
+                               (40, f"{self.text_height * fs:.3f}"),
+                               (1, _dxf_text(text)),
+                               (50, f"{math.degrees(math.atan2(m.d, m.a)):.3f}"),
+                               (72, align),
+                               (11, f"{x0:.3f}"), (21, f"{y0:.3f}"), (31, 0.0),
+                               (100, "AcDbText"), (73, 1))  # bottom
+                        continue
+                    x0, y0 = x, y
+                    x, y = c[1:3]
+                    if C == "M":
+                        polyline(vertices, layer)
+                        vertices = [[x, y, 0.0]]
+                    elif C == "L":
+                        vertices.append([x, y, 0.0])
+                    elif C == "C":
+                        x1, y1, x2, y2 = c[3:]
+                        arc = _bezier_arc(x0, y0, x1, y1, x2, y2, x, y)
+                        if arc is not None:
+                            vertices[-1][2] = math.tan(arc[2] / 4)
+                            vertices.append([x, y, 0.0])
+                            continue
+                        polyline(vertices, layer)
+                        vertices = [[x, y, 0.0]]
+                        groups = [(100, "AcDbSpline"),
+                                  (210, 0.0), (220, 0.0), (230, 1.0),
+                                  (70, 8), (71, 3), (72, 8), (73, 4), (74, 0)]
+                        groups.extend((40, k) for k in (0.0,) * 4 + (1.0,) * 4)
+                        for px, py in ((x0, y0), (x1, y1), (x2, y2), (x, y)):
+                            groups.extend(((10, f"{px:.3f}"), (20, f"{py:.3f}"), (30, 0.0)))
+                        entity("SPLINE", layer, *groups)
+                    else:
+                        print("Unknown", c)
+                polyline(vertices, layer)
+
+        ltype = next(handles)
+        tables = [
+            "  0\nSECTION\n  2\nTABLES\n",
+            f"  0\nTABLE\n  2\nLTYPE\n  5\n{next(handles):X}\n100\nAcDbSymbolTable\n 70\n1\n",
+            f"  0\nLTYPE\n  5\n{ltype:X}\n100\nAcDbSymbolTableRecord\n100\nAcDbLinetypeTableRecord\n"
+            "  2\nCONTINUOUS\n 70\n0\n  3\nSolid line\n 72\n65\n 73\n0\n 40\n0.0\n",
+            "  0\nENDTAB\n",
+            f"  0\nTABLE\n  2\nLAYER\n  5\n{next(handles):X}\n100\nAcDbSymbolTable\n 70\n{len(layers)}\n",
+        ]
+        for name, (aci, rgb) in layers.items():
+            tables.append(
+                f"  0\nLAYER\n  5\n{next(handles):X}\n100\nAcDbSymbolTableRecord\n100\nAcDbLayerTableRecord\n"
+                f"  2\n{name}\n 70\n0\n 62\n{aci}\n420\n{rgb}\n  6\nCONTINUOUS\n")
+        tables.append("  0\nENDTAB\n  0\nENDSEC\n")
+
+        with self._open("ascii", "replace") as f:
+            f.write(self._metadata())
+            f.write("  0\nSECTION\n  2\nHEADER\n"
+                    "  9\n$ACADVER\n  1\nAC1015\n"
+                    f"  9\n$HANDSEED\n  5\n{next(handles):X}\n"
+                    "  9\n$INSUNITS\n 70\n4\n"  # mm
+                    "  9\n$MEASUREMENT\n 70\n1\n"
+                    "  9\n$EXTMIN\n 10\n0.0\n 20\n0.0\n 30\n0.0\n"
+                    f"  9\n$EXTMAX\n 10\n{extents.width:.3f}\n 20\n{extents.height:.3f}\n 30\n0.0\n"
+                    "  0\nENDSEC\n")
+            f.writelines(tables)
+            f.write("  0\nSECTION\n  2\nENTITIES\n")
+            f.writelines(entities)
+            f.write("  0\nENDSEC\n  0\nEOF\n")
+
+
+class PlotterSurface(Surface):
+    """Base class for formats that drive a machine directly
+
+    Paths are split into cuts at every move. Cuts are grouped by color in
+    the order of cut_order (inner cuts before outer cuts) and within each
+    group sorted by a nearest neighbour search to keep travel short.
+    Texts are not supported and skipped.
+    """
+
+    # colors as 4*r + 2*g + b in the order they are cut:
+    # etching, deep etching, annotations, others, inner cut, outer cut
+    cut_order = [2, 3, 4, 5, 6, 7, 1, 0]
+
+    # max deviation of curves approximated by lines (in mm)
+    tolerance = 0.01
+
+    def _cuts(self, inner_corners):
+        """Return lists of cuts by color index"""
+        cuts: dict[int, list[list[Any]]] = {}
+        for part in self.parts:
+            for path in part.pathes:
+                rgb = path.params["rgb"]
+                color = cuts.setdefault(
+                    4 * int(rgb[0]) + 2 * int(rgb[1]) + int(rgb[2]), [])
+                path.faster_edges(inner_corners)
+                for c in path:
+                    if c[0] == "M":
+                        color.append([c])
+                    elif c[0] in "LC":
+                        color[-1].append(c)
+        return {i: [c for c in color if len(c) > 1] for i, color in cuts.items()}
+
+    def _ordered_cuts(self, inner_corners):
+        """Return the cuts in the order to be made. Also sets .travel and
+        .travel_unsorted to the distance traveled between cuts (in mm)"""
+        cuts = self._cuts(inner_corners)
+        result: list[tuple[int, list[Any]]] = []
+        self.travel = self.travel_unsorted = 0.0
+        x = y = 0.0
+        for color in self.cut_order:
+            self.travel_unsorted += _travel(cuts.get(color, []), x, y)
+            if cuts.get(color):
+                x, y = cuts[color][-1][-1][1:3]
+        x = y = 0.0
+        for color in self.cut_order:
+            ordered, travel = _sort_cuts(cuts.get(color, []), x, y)
+            # the generators already draw in a sensible order at times
+            unsorted = cuts.get(color, [])
+            if travel > _travel(unsorted, x, y):
+                ordered, travel = unsorted, _travel(unsorted, x, y)
+            self.travel += travel
+            result.extend((color, cut) for cut in ordered)
+            if ordered:
+                x, y = ordered[-1][-1][1:3]
+        self.travel /= self.scale
+        self.travel_unsorted /= self.scale
+        return result
+
+    def _segments(self, cut):
+        """Yield ("L", x, y) and ("A", x, y, xc, yc, angle) for the
+        segments of cut with curves that are not arcs turned into lines"""
+        x, y = cut[0][1:3]
+        for c in cut[1:]:
+            x0, y0 = x, y
+            C, x, y = c[0:3]
+            if C == "L":
+                yield c
+                continue
+            arc = _bezier_arc(x0, y0, *c[3:], x, y)
+            if arc is not None:
+                yield ("A", x, y) + arc
+            else:
+                for p in _flatten_bezier(x0, y0, *c[3:], x, y,
+                                         self.tolerance * self.scale):
+                    yield ("L",) + p
+
+
+class GCodeSurface(PlotterSurface):
+    """Writes G-code for laser cutters (like GRBL)
+
+    Arcs become G2/G3 moves. The tool commands can be changed in the
+    class attributes.
+    """
+
+    feed_rate = 1000  # mm/min
+    tool_on = "M3 S1000"
+    tool_off = "M5"
+
+    def finish(self, inner_corners="loop"):
+        self._adjust_coordinates()
+        cuts = self._ordered_cuts(inner_corners)
+        md = self.metadata
+
+        with self._open("ascii", "replace") as f:
+            f.write("; Boxes.py - {group} - {name}\n".format(**md))
+            f.write(f"; Created: {self._creation_date()}\n")
+            f.write(f"; {md.get('url') or md['cli']}\n")
+            f.write(f"; Travel: {self.travel:.0f}mm "
+                    f"(unsorted: {self.travel_unsorted:.0f}mm)\n")
+            f.write(f"G21\nG90\n{self.tool_off}\nF{self.feed_rate}\n")
+            last_color = None
+            for color, cut in cuts:
+                if color != last_color:
+                    f.write(f"; color {color >> 2 & 1} {color >> 1 & 1} {color & 1}\n")
+                    last_color = color
+                x, y = cut[0][1:3]
+                f.write(f"G0 X{x:.3f} Y{y:.3f}\n{self.tool_on}\n")
+                for c in self._segments(cut):
+                    x0, y0 = x, y
+                    C, x, y = c[0:3]
+                    if C == "L":
+                        f.write(f"G1 X{x:.3f} Y{y:.3f}\n")
+                    else:
+                        xc, yc, angle = c[3:]
+                        f.write(f"{'G3' if angle > 0 else 'G2'} X{x:.3f} Y{y:.3f} "
+                                f"I{xc - x0:.3f} J{yc - y0:.3f}\n")
+                f.write(f"{self.tool_off}\n")
+            f.write("G0 X0 Y0\nM2\n")
+
+
+class HPGLSurface(PlotterSurface):
+    """Writes HP-GL for plotters and cutters
+
+    Each color uses its own pen (black is pen 1). Arcs become AA commands.
+    """
+
+    scale = 40  # plotter units per mm
+
+    def finish(self, inner_corners="loop"):
+        self._adjust_coordinates()
+        cuts = self._ordered_cuts(inner_corners)
+
+        with self._open("ascii", "replace") as f:
+            f.write("IN;")
+            last_color = None
+            for color, cut in cuts:
+                if color != last_color:
+                    f.write(f"SP{color + 1};")
+                    last_color = color
+                x, y = cut[0][1:3]
+                f.write(f"PU{x:.0f},{y:.0f};PD")
+                points: list[str] = []
+                for c in self._segments(cut):
+                    if c[0] == "L":
+                        points.append(f"{c[1]:.0f},{c[2]:.0f}")
+                        continue
+                    xc, yc, angle = c[3:]
+                    f.write(f"{','.join(points)};AA{xc:.0f},{yc:.0f},{math.degrees(angle):.3f};PD")
+                    points = []
+                f.write(f"{','.join(points)};PU;\n")
+            f.write("SP0;\n")
+
+
+def _dxf_text(text):
+    """Escape non ASCII characters and line breaks for DXF string values"""
+    text = text.replace("\n", " ")
+    return "".join(c if ord(c) < 128 else f"\\U+{ord(c):04X}" for c in text)
+
+
+def _bezier_arc(x0, y0, x1, y1, x2, y2, x3, y3):
+    """Return center and angle (counter clockwise in radians) if the curve
+    is a circular arc as drawn by Context._arc() and None otherwise"""
+    # the center is where the normals at both ends meet
+    tx0, ty0 = x1 - x0, y1 - y0
+    tx3, ty3 = x3 - x2, y3 - y2
+    det = tx0 * ty3 - ty0 * tx3
+    if abs(det) <= 1e-9 * math.hypot(tx0, ty0) * math.hypot(tx3, ty3):
+        return None
+    d0 = tx0 * x0 + ty0 * y0
+    d3 = tx3 * x3 + ty3 * y3
+    xc = (d0 * ty3 - ty0 * d3) / det
+    yc = (tx0 * d3 - d0 * tx3) / det
+    # redo the calculation of Context._arc() and compare
+    ax, ay = x0 - xc, y0 - yc
+    bx, by = x3 - xc, y3 - yc
+    q1 = ax * ax + ay * ay
+    q2 = q1 + ax * bx + ay * by
+    cross = ax * by - ay * bx
+    if q2 < 0 or cross == 0:
+        return None
+    k2 = 4/3 * ((2 * q1 * q2)**0.5 - q2) / cross
+    if not (points_equal(x1, y1, x0 - k2 * ay, y0 + k2 * ax) and
+            points_equal(x2, y2, x3 + k2 * by, y3 - k2 * bx)):
+        return None
+    return xc, yc, math.atan2(cross, ax * bx + ay * by)
+
+
+def _flatten_bezier(x0, y0, x1, y1, x2, y2, x3, y3, tolerance):
+    """Return points on the curve (without the start) so that the lines
+    between them deviate at most tolerance from it"""
+    dd = max(math.hypot(x0 - 2 * x1 + x2, y0 - 2 * y1 + y2),
+             math.hypot(x1 - 2 * x2 + x3, y1 - 2 * y2 + y3))
+    n = max(1, math.ceil((0.75 * dd / tolerance)**0.5))
+    points = []
+    for i in range(1, n + 1):
+        t = i / n
+        s = 1 - t
+        a, b, c, d = s * s * s, 3 * s * s * t, 3 * s * t * t, t * t * t
+        points.append((a * x0 + b * x1 + c * x2 + d * x3,
+                       a * y0 + b * y1 + c * y2 + d * y3))
+    points[-1] = (x3, y3)
+    return points
+
+
+def _sort_cuts(cuts, x, y):
+    """Order cuts greedily by always going to the nearest start next
+
+    Open cuts may get reversed to start at their end. Returns the sorted
+    cuts and the distance traveled from (x, y) on.
+    """
+    if not cuts:
+        return [], 0.0
+    ends = []  # x, y, number of cut, reversed
+    for i, cut in enumerate(cuts):
+        ends.append((cut[0][1], cut[0][2], i, False))
+        if not points_equal(*cut[0][1:3], *cut[-1][1:3]):
+            ends.append((cut[-1][1], cut[-1][2], i, True))
+    xs = [e[0] for e in ends]
+    ys = [e[1] for e in ends]
+    size = max(max(xs) - min(xs), max(ys) - min(ys), EPS) / len(ends)**0.5
+    grid: dict[tuple[int, int], list[Any]] = {}
+    for e in ends:
+        grid.setdefault((math.floor(e[0] / size), math.floor(e[1] / size)), []).append(e)
+    xmin, xmax = min(k[0] for k in grid), max(k[0] for k in grid)
+    ymin, ymax = min(k[1] for k in grid), max(k[1] for k in grid)
+
+    done = [False] * len(cuts)
+    result = []
+    travel = 0.0
+    for _ in range(len(cuts)):
+        cx, cy = math.floor(x / size), math.floor(y / size)
+        rmax = max(cx - xmin, xmax - cx, cy - ymin, ymax - cy)
+        best, dist = None, math.inf
+        # start with the first ring touching the grid
+        r = max(0, xmin - cx, cx - xmax, ymin - cy, cy - ymax)
+        while r <= rmax and not dist <= (r - 1) * size:
+            # cells of the grid with a chebyshev distance of r
+            for i in range(max(cx - r, xmin), min(cx + r, xmax) + 1):
+                if abs(i - cx) == r:
+                    js: Any = range(max(cy - r, ymin), min(cy + r, ymax) + 1)
+                else:
+                    js = (cy - r, cy + r)
+                for j in js:
+                    cell = grid.get((i, j))
+                    if not cell:
+                        continue
+                    cell[:] = [e for e in cell if not done[e[2]]]
+                    for e in cell:
+                        d = math.hypot(e[0] - x, e[1] - y)
+                        if d < dist:
+                            best, dist = e, d
+            r += 1
+        done[best[2]] = True
+        cut = cuts[best[2]]
+        if best[3]:
+            cut = _reverse_cut(cut)
+        result.append(cut)
+        travel += dist
+        x, y = cut[-1][1:3]
+    return result, travel
+
+
+def _travel(cuts, x, y):
+    """Distance traveled between the cuts starting from (x, y)"""
+    travel = 0.0
+    for cut in cuts:
+        travel += math.hypot(cut[0][1] - x, cut[0][2] - y)
+        x, y = cut[-1][1:3]
+    return travel
+
+
+def _reverse_cut(cut):
+    result = [("M",) + tuple(cut[-1][1:3])]
+    for i in range(len(cut) - 1, 0, -1):
+        x, y = cut[i - 1][1:3]
+        if cut[i][0] == "C":
+            x1, y1, x2, y2 = cut[i][3:]
+            result.append(("C", x, y, x2, y2, x1, y1))
+        else:
+            result.append(("L", x, y))
+    return result
+
+
 from random import random
 
 
@@ -15,14 +15,13 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import inspect
 import math
 import re
 from abc import ABC, abstractmethod
 from typing import Any
 
-from boxes import gears
-
 
 def argparseSections(s: str) -> list[float]:
     """
@@ -164,21 +163,26 @@ class Settings:
     absolute_params: dict[str, Any] = {}  # TODO find better typing.
     relative_params: dict[str, Any] = {}  # TODO find better typing.
 
-    @classmethod
-    def parserArguments(cls, parser, prefix=None, **defaults):
-        prefix = prefix or cls.__name__[:-len("Settings")]
-
-        lines = cls.__doc__.split("\n")
-
-        # Parse doc string
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _parseDoc(doc):
+        """Return title and {name : description} of a Settings doc string"""
+        lines = doc.split("\n")
         descriptions = {}
         r = re.compile(r"^ +\* +(\S+) +: .* : +(.*)")
         for l in lines:
             m = r.search(l)
             if m:
                 descriptions[m.group(1)] = m.group(2)
+        return lines[0] or lines[1], descriptions
+
+    @classmethod
+    def parserArguments(cls, parser, prefix=None, **defaults):
+        prefix = prefix or cls.__name__[:-len("Settings")]
+
+        title, descriptions = cls._parseDoc(cls.__doc__)
 
-        group = parser.add_argument_group(lines[0] or lines[1])
+        group = parser.add_argument_group(title)
         group.prefix = prefix
         for name, default in (sorted(cls.absolute_params.items()) +
                               sorted(cls.relative_params.items())):
@@ -283,12 +287,47 @@ class Settings:
             return self.values[name]
         raise AttributeError
 
+    def key(self):
+        """Values of the settings as tuple - for use as (part of a) dict key"""
+        return (self.__class__, self.thickness, tuple(self.values.items()))
+
 
 #############################################################################
 ### Edges
 #############################################################################
 
 
+def recorded(func):
+    """
+    Wrapper: draw repeated edges by replaying a recording
+
+    Records what the edge draws in its own coordinates together with
+    where it ends and replays it for later calls with the same
+    recordingKey(). Turned off by setting Boxes.edgecaching to False.
+
+    :param func: __call__ method of an Edge class to wrap
+    """
+
+    @functools.wraps(func)
+    def f(self, *args, **kw):
+        boxes = self.boxes
+        if not boxes.edgecaching:
+            return func(self, *args, **kw)
+        key = (func, args, self.recordingKey(kw))
+        try:
+            recording = boxes._edge_recordings.get(key)
+        except TypeError:  # unhashable parameters
+            return func(self, *args, **kw)
+        if recording is None:
+            with self.ctx.local_recording() as recording:
+                func(self, *args, **kw)
+            if recording.translatable:
+                boxes._edge_recordings[key] = recording
+        self.ctx.replay_local(recording)
+
+    return f
+
+
 class BaseEdge(ABC):
     """Abstract base class for all Edges"""
     char: str | None = None
@@ -307,6 +346,21 @@ class BaseEdge(ABC):
     def __call__(self, length, **kw):
         pass
 
+    def recordingKey(self, kw):
+        """Everything but the positional parameters the drawing of the edge
+        depends on. See recorded()
+
+        :param kw: keyword parameters of the call
+        """
+        boxes, ctx = self.boxes, self.ctx
+        return (self.__class__, tuple(sorted(kw.items())),
+                tuple((name, value) for name, value in self.__dict__.items()
+                      if name not in ("boxes", "ctx", "settings")),
+                self.settings.key() if isinstance(self.settings, Settings)
+                else self.settings,
+                boxes.burn, boxes.thickness, boxes.tabs, boxes.bedBoltSettings,
+                ctx._xy, ctx._rgb, ctx._lw)
+
     def startwidth(self) -> float:
         """Amount of space the beginning of the edge is set below the inner space of the part """
         return 0.0
@@ -944,6 +998,7 @@ class FingerJointEdge(BaseEdge, FingerJointBase):
         else:
             self.polyline(0, 90, h, -90, f, -90, h, 90)
 
+    @recorded
     def __call__(self, length, bedBolts=None, bedBoltSettings=None, **kw):
 
         positive = self.positive
@@ -1180,6 +1235,7 @@ class StackableBaseEdge(BaseEdge):
 
         self.fingerjointsettings = fingerjointsettings
 
+    @recorded
     def __call__(self, length, **kw):
         s = self.settings
         r = s.height / 2.0 / (1 - math.cos(math.radians(s.angle)))
@@ -1391,6 +1447,7 @@ class Hinge(BaseEdge):
     def flushlen(self) -> float:
         return self.settings.axle + 2.0 * self.settings.hingestrength + 0.5 * self.settings.thickness
 
+    @recorded
     def __call__(self, l, **kw):
         hlen = getattr(self, self.settings.style + 'len', self.outsetlen)()
 
@@ -1504,6 +1561,11 @@ class HingePin(BaseEdge):
 
         return l
 
+    def recordingKey(self, kw):
+        # the grip is drawn by the "g" edge
+        return super().recordingKey(kw), self.edges['g'].recordingKey({})
+
+    @recorded
     def __call__(self, l, **kw):
         plen = getattr(self, self.settings.style + 'len', self.outsetlen)()
         glen = l * self.settings.grip_percentage / 100 + \
@@ -1589,6 +1651,11 @@ class ChestHinge(BaseEdge):
         self.char = "oO"[reversed]
         self.description = self.description + (' (start)', ' (end)')[reversed]
 
+    def recordingKey(self, kw):
+        # the rest of the edge may be drawn by the "F" edge
+        return super().recordingKey(kw), self.edges["F"].recordingKey({})
+
+    @recorded
     def __call__(self, l, **kw):
         t = self.settings.thickness
         p = self.settings.pin_height
@@ -1645,6 +1712,7 @@ class ChestHingeTop(ChestHinge):
         self.char = "oO"[reversed]
         self.description = self.description + (' (start)', ' (end)')[reversed]
 
+    @recorded
     def __call__(self, l, **kw):
         t = self.settings.thickness
         p = self.settings.pin_height
@@ -1688,6 +1756,11 @@ class ChestHingePin(BaseEdge):
 
     char = "q"
 
+    def recordingKey(self, kw):
+        # the rest of the edge may be drawn by the "F" edge
+        return super().recordingKey(kw), self.edges["F"].recordingKey({})
+
+    @recorded
     def __call__(self, l, **kw):
         t = self.settings.thickness
         p = self.settings.pin_height
@@ -1820,6 +1893,7 @@ class CabinetHingeEdge(BaseEdge):
 
         return poly, width
 
+    @recorded
     def __call__(self, l, **kw):
         n = self.settings.eyes_per_hinge
         p = self.settings.play
@@ -2191,6 +2265,7 @@ class ClickConnector(BaseEdge):
             2 * t,
         )
 
+    @recorded
     def __call__(self, length, **kw):
         t = self.settings.thickness
         self.edge(4 * t)
@@ -2219,6 +2294,7 @@ class ClickEdge(ClickConnector):
     def margin(self) -> float:
         return 0.0
 
+    @recorded
     def __call__(self, length, **kw):
         t = self.settings.thickness
         o = self.hookOffset()
@@ -2281,6 +2357,7 @@ class DoveTailJoint(BaseEdge):
     description = "Dove Tail Joint"
     positive = True
 
+    @recorded
     def __call__(self, length, **kw):
         s = self.settings
         radius = max(s.radius, self.boxes.burn)  # no smaller than burn
@@ -2447,9 +2524,10 @@ class RackEdge(BaseEdge):
 
     description = "Rack (and pinion) Edge"
 
-    def __init__(self, boxes, settings) -> None:
-        super().__init__(boxes, settings)
-        self.gear = gears.Gears(boxes)
+    @functools.cached_property
+    def gear(self):
+        from boxes import gears
+        return gears.Gears(self.boxes)
 
     def __call__(self, length, **kw):
         params = self.settings.values.copy()
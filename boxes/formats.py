@@ -14,31 +14,45 @@
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import functools
 import os
 import shutil
 import subprocess
 import tempfile
 
-from boxes.drawing import SVGSurface, PSSurface, LBRN2Surface, Context
+from boxes.drawing import SVGSurface, PSSurface, LBRN2Surface, DXFSurface, PDFSurface, GCodeSurface, HPGLSurface, Context
+
+
+@functools.lru_cache(maxsize=None)
+def findCommand(*candidates):
+    """Return the path of the first of the commands found - or None
+
+    The result is cached as looking through $PATH is slow compared to
+    creating a generator.
+    """
+    for cmd in candidates:
+        path = shutil.which(cmd)
+        if path:
+            return path
+    return None
 
 
 class Formats:
 
     pstoedit_candidates = ["/usr/bin/pstoedit", "pstoedit", "pstoedit.exe"]
-    ps2pdf_candidates = ["/usr/bin/ps2pdf", "ps2pdf", "ps2pdf.exe"]
 
-    _BASE_FORMATS = ['svg', 'svg_Ponoko', 'ps', 'lbrn2']
+    _BASE_FORMATS = ['svg', 'svg_Ponoko', 'ps', 'lbrn2', 'dxf', 'pdf', 'gcode', 'plt']
 
     formats = {
         "svg": None,
         "svg_Ponoko": None,
         "ps": None,
         "lbrn2": None,
-        "dxf": "{pstoedit} -flat 0.1 -f dxf:-mm {input} {output}",
-        "gcode": "{pstoedit} -f gcode {input} {output}",
-        "plt": "{pstoedit} -f plot-hpgl {input} {output}",
+        "dxf": None,
+        "gcode": None,
+        "plt": None,
         # "ai": "{pstoedit} -f ps2ai {input} {output}",
-        "pdf": "{ps2pdf} -dEPSCrop {input} {output}",
+        "pdf": None,
     }
 
     http_headers = {
@@ -47,6 +61,7 @@ class Formats:
         "ps": [('Content-type', 'application/postscript')],
         "lbrn2": [('Content-type', 'application/lbrn2')],
         "dxf": [('Content-type', 'image/vnd.dxf')],
+        "pdf": [('Content-type', 'application/pdf')],
         "plt": [('Content-type', ' application/vnd.hp-hpgl')],
         "gcode": [('Content-type', 'text/plain; charset=utf-8')],
 
@@ -54,14 +69,7 @@ class Formats:
     }
 
     def __init__(self) -> None:
-        for cmd in self.pstoedit_candidates:
-            self.pstoedit = shutil.which(cmd)
-            if self.pstoedit:
-                break
-        for cmd in self.ps2pdf_candidates:
-            self.ps2pdf = shutil.which(cmd)
-            if self.ps2pdf:
-                break
+        self.pstoedit = findCommand(*self.pstoedit_candidates)
 
     def getFormats(self):
         if self.pstoedit:
@@ -69,10 +77,23 @@ class Formats:
         return self._BASE_FORMATS
 
     def getSurface(self, fmt, filename):
+        """Return surface and context for rendering
+
+        :param fmt: output format
+        :param filename: name of the output file or a binary file object
+        """
         if fmt in ("svg", "svg_Ponoko"):
             surface = SVGSurface(filename)
         elif fmt == "lbrn2":
             surface = LBRN2Surface(filename)
+        elif fmt == "dxf":
+            surface = DXFSurface(filename)
+        elif fmt == "pdf":
+            surface = PDFSurface(filename)
+        elif fmt == "gcode":
+            surface = GCodeSurface(filename)
+        elif fmt == "plt":
+            surface = HPGLSurface(filename)
         else:
             surface = PSSurface(filename)
 
@@ -80,12 +101,31 @@ class Formats:
         return surface, ctx
 
     def convert(self, filename, fmt, metadata=None):
-
-        if fmt not in self._BASE_FORMATS:
+        """Convert PostScript output to fmt in place
+
+        filename may also be a seekable and readable binary file object
+        (like io.BytesIO) containing the PostScript only. It then gets
+        overwritten with the converted output.
+        """
+
+        if fmt not in self._BASE_FORMATS and hasattr(filename, "write"):
+            # the converters work on files
+            fd, tmpfile = tempfile.mkstemp()
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    filename.seek(0)
+                    shutil.copyfileobj(filename, f)
+                self.convert(tmpfile, fmt, metadata)
+                with open(tmpfile, "rb") as f:
+                    filename.seek(0)
+                    filename.truncate()
+                    shutil.copyfileobj(f, filename)
+            finally:
+                os.unlink(tmpfile)
+        elif fmt not in self._BASE_FORMATS:
             fd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(filename))
             cmd = self.formats[fmt].format(
                 pstoedit=self.pstoedit,
-                ps2pdf=self.ps2pdf,
                 input=filename,
                 output=tmpfile).split()
 
@@ -35,12 +35,15 @@
 # 			AttributeError: 'module' object inkex has no attribute 'uutounit
 # 			Fixed https://github.com/jnweiger/inkscape-gears-dev
 
+from __future__ import annotations
+
+from functools import lru_cache
 from math import pi, cos, sin, tan, radians, degrees, ceil, asin, acos, sqrt
 from os import devnull  # for debugging
+from typing import Any, Callable
 
 two_pi = 2 * pi
-import argparse
-from boxes.vectors import kerf, vdiff, vlength
+from boxes.vectors import kerf, rotm_array, vdiff, vlength, vtransl_array
 
 __version__ = '0.9'
 
@@ -191,9 +194,10 @@ def generate_rack_points(tooth_count, pitch, addendum, pressure_angle,
     return (points, p)
 
 
-def generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular):
+def spur_tooth_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular):
     """ given a set of core gear params
-        - generate the svg path for the gear
+        - generate the points of the tooth centered on the x axis
+          followed by the gap to the next tooth
     """
     half_thick_angle = two_pi / (4.0 * teeth ) #?? = pi / (2.0 * teeth)
     pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
@@ -203,186 +207,102 @@ def generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_ra
     radii = linspace(start_involute_radius, outer_radius, accuracy_involute)
     angles = [involute_intersect_angle(base_radius, r) for r in radii]
 
-    centers = [(x * two_pi / float( teeth) ) for x in range( teeth ) ]
-    points = []
-
-    for c in centers:
     # Angles
-        pitch1 = c - half_thick_angle
-        base1  = pitch1 - pitch_to_base_angle
-        offsetangles1 = [ base1 + x for x in angles]
-        points1 = [ point_on_circle( radii[i], offsetangles1[i]) for i in range(0,len(radii)) ]
-
-        pitch2 = c + half_thick_angle
-        base2  = pitch2 + pitch_to_base_angle
-        offsetangles2 = [ base2 - x for x in angles] 
-        points2 = [ point_on_circle( radii[i], offsetangles2[i]) for i in range(0,len(radii)) ]
-
-        points_on_outer_radius = [ point_on_circle(outer_radius, x) for x in linspace(offsetangles1[-1], offsetangles2[-1], accuracy_circular) ]
-
-        if root_radius > base_radius:
-            pitch_to_root_angle = pitch_to_base_angle - involute_intersect_angle(base_radius, root_radius )
-            root1 = pitch1 - pitch_to_root_angle
-            root2 = pitch2 + pitch_to_root_angle
-            points_on_root = [point_on_circle (root_radius, x) for x in linspace(root2, root1+(two_pi/float(teeth)), accuracy_circular) ]
-            p_tmp = points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root[1:-1] # [::-1] reverses list; [1:-1] removes first and last element
-        else:
-            points_on_root = [point_on_circle (root_radius, x) for x in linspace(base2, base1+(two_pi/float(teeth)), accuracy_circular) ]
-            p_tmp = points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root # [::-1] reverses list
+    pitch1 = - half_thick_angle
+    base1  = pitch1 - pitch_to_base_angle
+    offsetangles1 = [ base1 + x for x in angles]
+    points1 = [ point_on_circle( radii[i], offsetangles1[i]) for i in range(0,len(radii)) ]
+
+    pitch2 = half_thick_angle
+    base2  = pitch2 + pitch_to_base_angle
+    offsetangles2 = [ base2 - x for x in angles]
+    points2 = [ point_on_circle( radii[i], offsetangles2[i]) for i in range(0,len(radii)) ]
+
+    points_on_outer_radius = [ point_on_circle(outer_radius, x) for x in linspace(offsetangles1[-1], offsetangles2[-1], accuracy_circular) ]
+
+    if root_radius > base_radius:
+        pitch_to_root_angle = pitch_to_base_angle - involute_intersect_angle(base_radius, root_radius )
+        root1 = pitch1 - pitch_to_root_angle
+        root2 = pitch2 + pitch_to_root_angle
+        points_on_root = [point_on_circle (root_radius, x) for x in linspace(root2, root1+(two_pi/float(teeth)), accuracy_circular) ]
+        return points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root[1:-1] # [::-1] reverses list; [1:-1] removes first and last element
+    else:
+        points_on_root = [point_on_circle (root_radius, x) for x in linspace(base2, base1+(two_pi/float(teeth)), accuracy_circular) ]
+        return points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root # [::-1] reverses list
 
-        points.extend( p_tmp )
+@lru_cache(maxsize=128)
+def spur_tooth(teeth, pitch, angle, clearance, profile_shift, accuracy_involute, accuracy_circular, ring_gear=False):
+    """ points of one tooth of a spur or ring gear - cached as gears with
+        the same parameters are typically drawn again and again
+    """
+    (pitch_radius, base_radius, addendum, dedendum,
+     outer_radius, root_radius, tooth) = gear_calculations(teeth, pitch, angle, clearance, ring_gear, profile_shift*0.01)
+    return tuple(spur_tooth_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                   accuracy_involute, accuracy_circular))
 
-    return (points)
+def rotate_teeth(tooth, teeth):
+    """ place a copy of the tooth at each of the teeth positions """
+    import numpy as np
+    m = rotm_array(np.arange(teeth) * two_pi / float(teeth))
+    return vtransl_array(tooth, m).reshape(-1, 2).tolist()
+
+def generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular):
+    """ given a set of core gear params
+        - generate the svg path for the gear
+    """
+    return rotate_teeth(spur_tooth_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                          accuracy_involute, accuracy_circular), teeth)
 
 def inkbool(val):
     return val not in ("False", False, "0", 0, "None", None)
 
-class OptionParser(argparse.ArgumentParser):
-
-    types = {
-        "int" : int,
-        "float" : float,
-        "string" : str,
-        "inkbool" : inkbool,
-        }
+class GearOptions:
+    """ Gear parameters given as keyword arguments named like the options
+        of the original Inkscape extension. Values are converted the same
+        way as the command line options were.
+    """
 
-    def add_option(self, short, long_, **kw):
-        kw["type"] = self.types[kw["type"]]
-        names = []
-        if short:
-            names.append("-" + short.replace("-", "_")[1:])
-        if long_:
-            names.append("--" + long_.replace("-", "_")[2:])
-        self.add_argument(*names, **kw)
+    # name : (attribute, type, default, help)
+    options: dict[str, tuple[str, Callable[[str], Any], Any, str]] = {
+        "teeth": ("teeth", int, 24, "Number of teeth"),
+        "system": ("system", str, 'MM', "Select system: 'CP' (Cyclic Pitch (default)), 'DP' (Diametral Pitch), 'MM' (Metric Module)"),
+        "dimension": ("dimension", float, 1.0, "Tooth size, depending on system (which defaults to CP)"),
+        "angle": ("angle", float, 20.0, "Pressure Angle (common values: 14.5, 20, 25 degrees)"),
+        "profile_shift": ("profile_shift", float, 20.0, "Profile shift [in percent of the module]. Negative values help against undercut"),
+        "units": ("units", str, 'mm', "Units this dialog is using"),
+        "accuracy": ("accuracy", int, 0, "Accuracy of involute: automatic: 5..20 (default), best: 20(default), medium 10, low: 5; good accuracy is important with a low tooth count"),
+        # Clearance: Radial distance between top of tooth on one gear to bottom of gap on another.
+        "clearance": ("clearance", float, 0.0, "Clearance between bottom of gap of this gear and top of tooth of another"),
+        "annotation": ("annotation", inkbool, False, "Draw annotation text"),
+        "internal_ring": ("internal_ring", inkbool, False, "Ring (or Internal) gear style (default: normal spur gear)"),
+        "mount_hole": ("mount_hole", float, 0., "Mount hole diameter"),
+        "mount_diameter": ("mount_diameter", float, 15, "Mount support diameter"),
+        "spoke_count": ("spoke_count", int, 3, "Spokes count"),
+        "spoke_width": ("spoke_width", float, 5, "Spoke width"),
+        "holes_rounding": ("holes_rounding", float, 5, "Holes rounding"),
+        "active_tab": ("active_tab", str, '', "Active tab. Not used now."),
+        "centercross": ("centercross", inkbool, False, "Draw cross in center"),
+        "pitchcircle": ("pitchcircle", inkbool, False, "Draw pitch circle (for mating)"),
+        "draw_rack": ("drawrack", inkbool, False, "Draw rack gear instead of spur gear"),
+        "rack_teeth_length": ("teeth_length", int, 12, "Length (in teeth) of rack"),
+        "rack_base_height": ("base_height", float, 8, "Height of base of rack"),
+        "rack_base_tab": ("base_tab", float, 14, "Length of tabs on ends of rack"),
+        "undercut_alert": ("undercut_alert", inkbool, False, "Let the user confirm a warning dialog if undercut occurs. This dialog also shows helpful hints against undercut"),
+    }
+
+    def __init__(self, **kw) -> None:
+        for attribute, type_, default, help in self.options.values():
+            setattr(self, attribute, default)
+        for name, value in kw.items():
+            if name not in self.options:
+                raise ValueError("unknown gear option '%s'" % name)
+            attribute, type_ = self.options[name][:2]
+            setattr(self, attribute, type_(str(value)))
 
 class Gears():
 
     def __init__(self, boxes, **kw) -> None:
-        # an alternate way to get debug info:
-        # could use inkex.debug(string) instead...
-        #try:
-        #    self.tty = open("/dev/tty", 'w')
-        #except:
-        #    self.tty = open(devnull, 'w')  # '/dev/null' for POSIX, 'nul' for Windows.
-        #    # print >>self.tty, "gears-dev " + __version__
-
         self.boxes = boxes
-        self.OptionParser = OptionParser()
-        self.OptionParser.add_option("-t", "--teeth",
-                                     action="store", type="int",
-                                     dest="teeth", default=24,
-                                     help="Number of teeth")
-
-        self.OptionParser.add_option("-s", "--system",
-                                     action="store", type="string", 
-                                     dest="system", default='MM',
-                                     help="Select system: 'CP' (Cyclic Pitch (default)), 'DP' (Diametral Pitch), 'MM' (Metric Module)")
-
-        self.OptionParser.add_option("-d", "--dimension",
-                                     action="store", type="float",
-                                     dest="dimension", default=1.0,
-                                     help="Tooth size, depending on system (which defaults to CP)")
-
-
-        self.OptionParser.add_option("-a", "--angle",
-                                     action="store", type="float",
-                                     dest="angle", default=20.0,
-                                     help="Pressure Angle (common values: 14.5, 20, 25 degrees)")
-
-        self.OptionParser.add_option("-p", "--profile-shift",
-                                     action="store", type="float",
-                                     dest="profile_shift", default=20.0,
-                                     help="Profile shift [in percent of the module]. Negative values help against undercut")
-
-        self.OptionParser.add_option("-u", "--units",
-                                     action="store", type="string",
-                                     dest="units", default='mm',
-                                     help="Units this dialog is using")
-
-        self.OptionParser.add_option("-A", "--accuracy",
-                                     action="store", type="int",
-                                     dest="accuracy", default=0,
-                                     help="Accuracy of involute: automatic: 5..20 (default), best: 20(default), medium 10, low: 5; good accuracy is important with a low tooth count")
-        # Clearance: Radial distance between top of tooth on one gear to bottom of gap on another.
-        self.OptionParser.add_option("", "--clearance",
-                                     action="store", type="float",
-                                     dest="clearance", default=0.0,
-                                     help="Clearance between bottom of gap of this gear and top of tooth of another")
-
-        self.OptionParser.add_option("", "--annotation",
-                                     action="store", type="inkbool", 
-                                     dest="annotation", default=False,
-                                     help="Draw annotation text")
-
-        self.OptionParser.add_option("-i", "--internal-ring",
-                                     action="store", type="inkbool",
-                                     dest="internal_ring", default=False,
-                                     help="Ring (or Internal) gear style (default: normal spur gear)")
-
-        self.OptionParser.add_option("", "--mount-hole",
-                                     action="store", type="float",
-                                     dest="mount_hole", default=0.,
-                                     help="Mount hole diameter")
-
-        self.OptionParser.add_option("", "--mount-diameter",
-                                     action="store", type="float",
-                                     dest="mount_diameter", default=15,
-                                     help="Mount support diameter")
-
-        self.OptionParser.add_option("", "--spoke-count",
-                                     action="store", type="int",
-                                     dest="spoke_count", default=3,
-                                     help="Spokes count")
-
-        self.OptionParser.add_option("", "--spoke-width",
-                                     action="store", type="float",
-                                     dest="spoke_width", default=5,
-                                     help="Spoke width")
-
-        self.OptionParser.add_option("", "--holes-rounding",
-                                     action="store", type="float",
-                                     dest="holes_rounding", default=5,
-                                     help="Holes rounding")
-
-        self.OptionParser.add_option("", "--active-tab",
-                                     action="store", type="string",
-                                     dest="active_tab", default='',
-                                     help="Active tab. Not used now.")
-
-        self.OptionParser.add_option("-x", "--centercross",
-                                     action="store", type="inkbool", 
-                                     dest="centercross", default=False,
-                                     help="Draw cross in center")
-
-        self.OptionParser.add_option("-c", "--pitchcircle",
-                                     action="store", type="inkbool",
-                                     dest="pitchcircle", default=False,
-                                     help="Draw pitch circle (for mating)")
-
-        self.OptionParser.add_option("-r", "--draw-rack",
-                                     action="store", type="inkbool", 
-                                     dest="drawrack", default=False,
-                                     help="Draw rack gear instead of spur gear")
-
-        self.OptionParser.add_option("", "--rack-teeth-length",
-                                     action="store", type="int",
-                                     dest="teeth_length", default=12,
-                                     help="Length (in teeth) of rack")
-
-        self.OptionParser.add_option("", "--rack-base-height",
-                                     action="store", type="float",
-                                     dest="base_height", default=8,
-                                     help="Height of base of rack")
-
-        self.OptionParser.add_option("", "--rack-base-tab",
-                                     action="store", type="float",
-                                     dest="base_tab", default=14,
-                                     help="Length of tabs on ends of rack")
-
-        self.OptionParser.add_option("", "--undercut-alert",
-                                     action="store", type="inkbool", 
-                                     dest="undercut_alert", default=False,
-                                     help="Let the user confirm a warning dialog if undercut occurs. This dialog also shows helpful hints against undercut")
 
     def calc_circular_pitch(self):
         """We use math based on circular pitch."""
@@ -487,7 +407,7 @@ class Gears():
         return messages
 
     def sizes(self, **kw):
-        self.options = self.OptionParser.parse_args([f"--{name}={value}" for name, value in kw.items()])
+        self.options = GearOptions(**kw)
         # Pitch (circular pitch): Length of the arc from one tooth to the next)
         # Pitch diameter: Diameter of pitch circle.
         pitch = self.calc_circular_pitch()
@@ -549,7 +469,7 @@ class Gears():
               iterate through them
             - Turn on other visual features e.g. cross, rack, annotations, etc
         """
-        self.options = self.OptionParser.parse_args([f"--{name}={value}" for name, value in kw.items()])
+        self.options = GearOptions(**kw)
 
         warnings = [] # list of extra messages to be shown in annotations
         # calculate unit factor for units defined in dialog. 
@@ -636,7 +556,9 @@ class Gears():
             warnings.extend(msg.split("\n"))
 
         # All base calcs done. Start building gear
-        points = generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular)
+        tooth = spur_tooth(teeth, pitch, angle, clearance, self.options.profile_shift,
+                           accuracy_involute, accuracy_circular, self.options.internal_ring)
+        points = rotate_teeth(tooth, teeth)
 
         if not teeth_only:
             self.boxes.moveTo(width/2, height/2)
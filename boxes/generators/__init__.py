@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import ast
+import builtins
+import hashlib
 import importlib
+import importlib.util
 import inspect
+import json
+import os
 import pkgutil
 from types import ModuleType
 from typing import Any
@@ -71,3 +77,224 @@ def getAllGeneratorModules() -> dict[str, ModuleType]:
         module = importlib.import_module(modname)
         generators[modname.split('.')[-1]] = module
     return generators
+
+
+class GeneratorInfo:
+    """Meta data of a generator class read from the source of its module
+
+    Can be used in place of the class for listing generators. Use .load()
+    to import the module and get the class itself.
+    """
+
+    def __init__(self, name: str, module: str, ui_group: str = "Misc",
+                 doc: str | None = None, webinterface: bool = True) -> None:
+        self.__name__ = name
+        self.__doc__ = doc
+        self.module = module
+        self.ui_group = ui_group
+        self.webinterface = webinterface
+
+    def __repr__(self) -> str:
+        return f"<GeneratorInfo {self.module}.{self.__name__}>"
+
+    def load(self) -> type[boxes.Boxes]:
+        return getattr(importlib.import_module(self.module), self.__name__)
+
+
+_INDEX_VERSION = 1
+_index: dict[str, GeneratorInfo] | None = None
+
+
+def _dottedName(node) -> str | None:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = _dottedName(node.value)
+        return value and f"{value}.{node.attr}"
+    return None
+
+
+def _scanModule(path: str) -> dict[str, Any]:
+    """Return the imports and classes of a module without importing it"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    result: dict[str, Any] = {"from": {}, "import": {}, "star": [], "classes": {}}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            for alias in node.names:
+                if alias.name == "*":
+                    result["star"].append(module)
+                else:
+                    result["from"][alias.asname or alias.name] = [module, alias.name]
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    result["import"][alias.asname] = alias.name
+                else:
+                    name = alias.name.split(".")[0]
+                    result["import"][name] = name
+        elif isinstance(node, ast.ClassDef):
+            cls: dict[str, Any] = {
+                "bases": [_dottedName(b) for b in node.bases],
+                "doc": ast.get_docstring(node, clean=False),
+                "attributes": {},
+            }
+            for stmt in node.body:
+                if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+                    target, value = stmt.targets[0], stmt.value
+                elif isinstance(stmt, ast.AnnAssign) and stmt.value:
+                    target, value = stmt.target, stmt.value
+                else:
+                    continue
+                if isinstance(target, ast.Name) and target.id in ("ui_group", "webinterface"):
+                    try:
+                        cls["attributes"][target.id] = ast.literal_eval(value)
+                    except ValueError:  # needs to be imported to know
+                        cls["dynamic"] = True
+            result["classes"][node.name] = cls
+    return result
+
+
+def _indexFile() -> str:
+    """Cache file in the user's cache dir - one per generators directory"""
+    directory = __path__[0]
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    digest = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()[:12]
+    return os.path.join(cache, "boxes.py", f"generators-{digest}.json")
+
+
+def _scanModules() -> dict[str, Any]:
+    """Scan all generator modules reusing cached results of unchanged files"""
+    filename = _indexFile()
+    try:
+        with open(filename) as f:
+            cached = json.load(f)
+        if cached.get("version") != _INDEX_VERSION:
+            cached = {}
+    except (OSError, ValueError):
+        cached = {}
+    cached = cached.get("modules", {})
+
+    modules = {}
+    changed = False
+    for importer, modname, ispkg in pkgutil.iter_modules(path=__path__, prefix=__name__ + '.'):
+        if ispkg:
+            continue
+        path = os.path.join(__path__[0], modname.split(".")[-1] + ".py")
+        stat = os.stat(path)
+        entry = cached.get(modname)
+        if not entry or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size:
+            entry = _scanModule(path)
+            entry["mtime"] = stat.st_mtime
+            entry["size"] = stat.st_size
+            changed = True
+        modules[modname] = entry
+    if changed or len(modules) != len(cached):
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename + ".tmp", "w") as f:
+                json.dump({"version": _INDEX_VERSION, "modules": modules}, f)
+            os.replace(filename + ".tmp", filename)
+        except OSError:
+            pass
+    return modules
+
+
+def _lookup(modname: str, dotted: str, modules: dict[str, Any]) -> Any:
+    """Find what dotted refers to in the generator module modname
+
+    Returns (module name, class name) for classes in generator modules
+    and the object itself otherwise (None if not found).
+    """
+    module = modules[modname]
+    head, *rest = dotted.split(".")
+    obj: Any = None
+    if not rest and head in module["classes"]:
+        return (modname, head)
+    if head in module["from"]:
+        name, orig = module["from"][head]
+        if name.startswith("."):
+            name = importlib.util.resolve_name(name, __name__)
+        if name in modules:
+            if rest:
+                return None
+            return _lookup(name, orig, modules)
+        obj = getattr(importlib.import_module(name), orig, None)
+    elif head in module["import"]:
+        obj = importlib.import_module(module["import"][head])
+    else:
+        for name in module["star"]:
+            if name.startswith("."):
+                name = importlib.util.resolve_name(name, __name__)
+            if name in modules:
+                continue
+            obj = getattr(importlib.import_module(name), head, None)
+            if obj is not None:
+                break
+        else:
+            obj = getattr(builtins, head, None)
+    for part in rest:
+        obj = getattr(obj, part, None)
+    return obj
+
+
+def _classAttributes(modname: str, name: str, modules: dict[str, Any],
+                     done: dict[tuple[str, str], Any]) -> dict[str, Any] | None:
+    """Return ui_group and webinterface of a class or None if it is not
+    derived from boxes.Boxes"""
+    key = (modname, name)
+    if key in done:
+        return done[key]
+    done[key] = None  # guard against cycles
+    cls = modules[modname]["classes"][name]
+    result = None
+    for base in cls["bases"]:
+        found = base and _lookup(modname, base, modules)
+        if isinstance(found, tuple):
+            base_module, base_name = found
+            inherited = _classAttributes(base_module, base_name, modules, done)
+        elif inspect.isclass(found) and issubclass(found, boxes.Boxes):
+            inherited = {"ui_group": found.ui_group,
+                         "webinterface": found.webinterface}
+        else:
+            continue
+        if inherited is not None:
+            result = dict(inherited)
+            break
+    if result is not None:
+        if cls.get("dynamic"):
+            cls_obj = getattr(importlib.import_module(modname), name)
+            result = {"ui_group": cls_obj.ui_group,
+                      "webinterface": cls_obj.webinterface}
+        else:
+            result.update(cls["attributes"])
+    done[key] = result
+    return result
+
+
+def getGeneratorIndex() -> dict[str, GeneratorInfo]:
+    """Return the generators like getAllBoxGenerators() but without importing
+    their modules
+
+    Classes imported from other generator modules are only listed
+    under the module they are defined in.
+    """
+    global _index
+    if _index is not None:
+        return _index
+    modules = _scanModules()
+    done: dict[tuple[str, str], Any] = {}
+    index = {}
+    for modname, module in modules.items():
+        if modname.split('.')[-1].startswith("_"):
+            continue
+        for name, cls in module["classes"].items():
+            if name[0] == "_":
+                continue
+            attributes = _classAttributes(modname, name, modules, done)
+            if attributes is not None:
+                index[modname + '.' + name] = GeneratorInfo(
+                    name, modname, doc=cls["doc"], **attributes)
+    _index = index
+    return index
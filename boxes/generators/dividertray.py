@@ -88,6 +88,8 @@ You will likely need to cut each of the dividers you want multiple times.
 """
 
     ui_group = "Tray"
+    # many equal walls
+    partcaching = True
 
     def __init__(self) -> None:
         Boxes.__init__(self)
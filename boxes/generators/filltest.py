@@ -65,7 +65,8 @@ class FillTest(Boxes): # Change class name!
             min_radius=self.fillHoles_hole_min_radius,
             style=self.fillHoles_hole_style,
             bar_length=self.fillHoles_bar_length,
-            max_random=self.fillHoles_max_random
+            max_random=self.fillHoles_max_random,
+            seed=self.fillHoles_random_seed
             )
         end_time = time.time()
 
@@ -21,6 +21,8 @@ class SmallPartsTray(Boxes):
     """Tray with slants to easier get out game tokens or screws"""
 
     ui_group = "Tray"
+    # many equal walls
+    partcaching = True
 
     def __init__(self) -> None:
         Boxes.__init__(self)
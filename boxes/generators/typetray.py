@@ -20,6 +20,8 @@ class TypeTray(_TopEdge):
     """Type tray - allows only continuous walls"""
 
     ui_group = "Tray"
+    # many equal walls
+    partcaching = True
 
     def __init__(self) -> None:
         Boxes.__init__(self)
@@ -130,12 +130,11 @@ class Pulley:
             else:
                 self.boxes.hole(0, 0, r_axle)
 
-        points = []
-        for i in range(teeth):
-            m = [[tooth_width_scale, 0, 0],
-                 [0, tooth_depth_scale, -tooth_distance_from_centre]]
-            m = mmul(m, rotm(i * 2 * pi / teeth))
-            points.extend(vtransl(pt, m) for pt in self.teeth[profile][1:-1])
+        import numpy as np
+        m = [[tooth_width_scale, 0, 0],
+             [0, tooth_depth_scale, -tooth_distance_from_centre]]
+        m = mmul_array(m, rotm_array(np.arange(teeth) * 2 * pi / teeth))
+        points = vtransl_array(self.teeth[profile][1:-1], m).reshape(-1, 2).tolist()
 
         self.boxes.drawPoints(points, kerfdir=-1 if insideout else 1)
         self.boxes.move(total_width, total_width, move)
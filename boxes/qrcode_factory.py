@@ -1,7 +1,24 @@
 from decimal import Decimal
+from functools import lru_cache
+
+import qrcode
 import qrcode.image.base
 import qrcode.image.svg
 
+
+@lru_cache(maxsize=32)
+def qrcode_modules(content):
+    """
+    Return the modules (without border) of the QR code for content
+
+    Cached as the same URL is typically rendered again and again.
+    """
+    q = qrcode.QRCode()
+    q.add_data(content)
+    q.make()
+    return tuple(tuple(row) for row in q.modules)
+
+
 class BoxesQrCodeFactory(qrcode.image.base.BaseImage):
     """
     SVG image builder
@@ -10,6 +27,7 @@ class BoxesQrCodeFactory(qrcode.image.base.BaseImage):
     _SVG_namespace = "http://www.w3.org/2000/svg"
     kind = "SVG"
     allowed_kinds = ("SVG",)
+    needs_processing = True
 
     def __init__(self, *args, ctx=None, x=0, y=0, **kwargs):
         super().__init__(*args, **kwargs)
@@ -19,8 +37,63 @@ class BoxesQrCodeFactory(qrcode.image.base.BaseImage):
         self.unit_size = self.units(self.box_size)
 
     def drawrect(self, row, col):
-        self.ctx.rectangle(*self._rect(row, col))
         self._img.append(self._rect(row, col))
+        self._modules.add((row, col))
+
+    def process(self):
+        """Draw the outlines of connected modules instead of each module"""
+        size = self.box_size / 10
+        for outline in self._outlines():
+            self.ctx.stroke()
+            for i, (row, col) in enumerate(outline):
+                x = self.x + (row + self.border) * size
+                y = self.y + (col + self.border) * size
+                if i == 0:
+                    self.ctx.move_to(x, y)
+                else:
+                    self.ctx.line_to(x, y)
+            self.ctx.stroke()
+
+    def _outlines(self):
+        """Closed outlines of the dark modules as lists of grid corners"""
+        # unit edges running counter clockwise around each module
+        # edges between two dark modules cancel out
+        edges = set()
+        for row, col in self._modules:
+            corners = ((row, col), (row + 1, col), (row + 1, col + 1), (row, col + 1))
+            for i in range(4):
+                edge = (corners[i], corners[i - 3])
+                reverse = (edge[1], edge[0])
+                if reverse in edges:
+                    edges.remove(reverse)
+                else:
+                    edges.add(edge)
+        starts = {}
+        for start, end in edges:
+            starts.setdefault(start, []).append(end)
+
+        outlines = []
+        for start in sorted(starts):
+            while starts[start]:
+                outline = [start]
+                point, end = start, starts[start].pop()
+                direction = (end[0] - start[0], end[1] - start[1])
+                while True:
+                    if direction != (end[0] - point[0], end[1] - point[1]):
+                        outline.append(point)
+                    direction = (end[0] - point[0], end[1] - point[1])
+                    point = end
+                    if point == start:
+                        break
+                    ends = starts[point]
+                    # keep modules touching only at a corner apart by
+                    # turning left
+                    ends.sort(key=lambda e: direction[0] * (e[1] - point[1]) -
+                              direction[1] * (e[0] - point[0]))
+                    end = ends.pop()
+                outline.append(start)
+                outlines.append(outline)
+        return outlines
 
     def units(self, pixels, text=True):
         """
@@ -40,6 +113,7 @@ class BoxesQrCodeFactory(qrcode.image.base.BaseImage):
 
     def new_image(self, **kwargs):
         self._img = []
+        self._modules = set()
         return self._img
 
     def _rect(self, row, col):
@@ -95,23 +95,69 @@ def kerf(points, k, closed=True):
     """Outset points by k
     Assumes a closed loop of points
     """
-    result = []
-    lp = len(points)
-
-    for i in range(len(points)):
-        # get normalized orthogonals of both segments
-        v1 = vorthogonal(normalize(vdiff(points[i - 1], points[i])))
-        v2 = vorthogonal(normalize(vdiff(points[i], points[(i + 1) % lp])))
-
-        if not closed:
-            if i == 0:
-                v1 = v2
-            if i == lp-1:
-                v2 = v1
-        # direction the point has to move
-        d = normalize(vadd(v1, v2))
-        # cos of the half the angle between the segments
-        cos_alpha = dotproduct(v1, d)
-        result.append(vadd(points[i], vscalmul(d, -k / cos_alpha)))
+    return [tuple(p) for p in kerf_array(points, k, closed).tolist()]
 
-    return result
+############################################################
+### NumPy versions working on whole contours at once
+### numpy is only imported when they are used
+############################################################
+
+def normalize_array(v):
+    """set length of all vectors in the (n, 2) array v to one"""
+    import numpy as np
+    l = np.sqrt(v[:, 0] * v[:, 0] + v[:, 1] * v[:, 1])
+    l[l == 0.0] = np.inf  # zero vectors stay zero
+    return v / l[:, None]
+
+
+def kerf_array(points, k, closed=True):
+    """Outset points by k - returns an (n, 2) array
+
+    Same as kerf() for many points at once.
+    """
+    import numpy as np
+    p = np.asarray(points, dtype=float).reshape(-1, 2)
+    if not len(p):
+        return p
+    # normalized orthogonals of the segments before and after each point
+    v2 = normalize_array(np.roll(p, -1, axis=0) - p)[:, ::-1] * (-1.0, 1.0)
+    v1 = np.roll(v2, 1, axis=0)
+    if not closed:
+        v1[0] = v2[0]
+        v2[-1] = v1[-1]
+    # direction the point has to move
+    d = normalize_array(v1 + v2)
+    # cos of the half the angle between the segments
+    cos_alpha = v1[:, 0] * d[:, 0] + v1[:, 1] * d[:, 1]
+    if (cos_alpha == 0.0).any():
+        raise ZeroDivisionError("Can't outset points reversing direction")
+    return p + d * (-k / cos_alpha)[:, None]
+
+
+def rotm_array(angles):
+    """Stack of rotation matrices (n, 2, 3) - see rotm()"""
+    import numpy as np
+    angles = np.asarray(angles, dtype=float)
+    c, s = np.cos(angles), np.sin(angles)
+    m = np.zeros(angles.shape + (2, 3))
+    m[..., 0, 0], m[..., 0, 1] = c, -s
+    m[..., 1, 0], m[..., 1, 1] = s, c
+    return m
+
+
+def mmul_array(m0, m1):
+    """mmul() for stacks of matrices (..., 2, 3)"""
+    import numpy as np
+    m0, m1 = np.asarray(m0, dtype=float), np.asarray(m1, dtype=float)
+    return m1[..., :, 0:1] * m0[..., 0:1, :] + m1[..., :, 1:2] * m0[..., 1:2, :]
+
+
+def vtransl_array(points, m):
+    """Transform the (n, 2) array of points by a stack of matrices
+    (..., 2, 3) - returns (..., n, 2)"""
+    import numpy as np
+    p = np.asarray(points, dtype=float).reshape(-1, 2)
+    m = np.asarray(m, dtype=float)[..., None, :, :]
+    x, y = p[:, 0], p[:, 1]
+    return np.stack((m[..., 0, 0] * x + m[..., 0, 1] * y + m[..., 0, 2],
+                     m[..., 1, 0] * x + m[..., 1, 1] * y + m[..., 1, 2]), axis=-1)
@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from boxes import Boxes
+
+
+def paths(box):
+    """Paths of all parts as lists of segments - strokes the current path
+    of a box that is not closed yet"""
+    if box.ctx is not None:
+        box.ctx.stroke()
+    return [list(p) for part in box.surface.parts for p in part.pathes]
+
+
+def numbers(paths):
+    """All coordinates (including text matrices) of paths"""
+    result = []
+    for p in paths:
+        for s in p:
+            for v in s:
+                if isinstance(v, tuple):  # Affine
+                    result.extend(v)
+                elif isinstance(v, float):
+                    result.append(v)
+    return result
+
+
+def assert_same_drawing(a, b):
+    """Paths a and b have the same segments with the same coordinates
+    (within float precision)"""
+    assert [[s[0] for s in p] for p in a] == [[s[0] for s in p] for p in b]
+    assert numbers(a) == pytest.approx(numbers(b))
+
+
+def render(make_box, cls, args=(), fmt="svg", **attributes):
+    """Render a generator into memory and return the closed instance.
+    attributes are set on the instance before rendering"""
+    box = make_box(cls, args, fmt)
+    for name, value in attributes.items():
+        setattr(box, name, value)
+    box.render()
+    box.close()
+    return box
+
+
+@pytest.fixture
+def make_box():
+    """Factory of opened Boxes instances rendering into memory"""
+
+    def make_box(cls=Boxes, args=(), fmt="svg"):
+        b = cls()
+        b.parseArgs(["--reference=0", "--format=" + fmt, *args])
+        b.output = io.BytesIO()
+        b.open()
+        return b
+
+    return make_box
+
+
+@pytest.fixture
+def box(make_box):
+    """Opened Boxes instance rendering SVG into memory"""
+    return make_box()
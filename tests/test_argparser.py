@@ -0,0 +1,44 @@
+"""Argument parsers shared between instances of a generator"""
+
+from argparse import ArgumentParser
+
+import pytest
+
+from boxes import Boxes, CachedArgParser
+from boxes.generators.closedbox import ClosedBox
+from boxes.generators.gridfinitybase import GridfinityBase
+from boxes.generators.typetray import TypeTray
+
+
+@pytest.fixture(autouse=True)
+def argparsers(monkeypatch):
+    monkeypatch.setattr(Boxes, "_argparsers", {})
+
+
+def parsed(cls, args):
+    b = cls()
+    b.parseArgs(list(args))
+    values = {a.dest: getattr(b, a.dest, None) for a in b.argparser._actions
+              if a.dest != "help"}
+    return b, values, b.edgesettings, b.non_default_args, b.metadata["cli_short"]
+
+
+@pytest.mark.parametrize("cls", [ClosedBox, TypeTray, GridfinityBase])
+@pytest.mark.parametrize("args", [[], ["--thickness=4", "--burn=0.2"]])
+def test_cached_parser(cls, args):
+    fresh, *expected = parsed(cls, args)
+    assert isinstance(fresh.argparser, ArgumentParser)
+    # other arguments do not stick to the shared parser
+    parsed(cls, ["--thickness=2", "--reference=10"])
+    cached, *values = parsed(cls, args)
+    assert isinstance(cached.argparser, CachedArgParser)
+    assert cached.argparser.parser is fresh.argparser
+    assert values == expected
+
+
+def test_parser_per_class():
+    parsed(ClosedBox, [])
+    assert not isinstance(TypeTray().argparser, CachedArgParser)
+    b = ClosedBox()
+    assert isinstance(b.argparser, CachedArgParser)
+    assert b.argparser.get_default("x") == 100.0
@@ -0,0 +1,143 @@
+"""Render cache of the web server (scripts/boxesserver)"""
+
+import datetime
+import importlib.machinery
+import importlib.util
+import os
+import socket
+import threading
+from wsgiref.simple_server import WSGIRequestHandler
+
+import pytest
+
+pytest.importorskip("markdown")
+pytest.importorskip("qrcode")
+
+
+@pytest.fixture(scope="module")
+def boxesserver():
+    path = os.path.join(os.path.dirname(__file__), "..", "scripts", "boxesserver")
+    loader = importlib.machinery.SourceFileLoader("boxesserver", path)
+    spec = importlib.util.spec_from_loader("boxesserver", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def get(server, path, query="", host="localhost"):
+    responses = []
+    environ = {"PATH_INFO": path, "QUERY_STRING": query,
+               "HTTP_HOST": host, "wsgi.url_scheme": "http"}
+    body = b"".join(
+        s if isinstance(s, bytes) else s.encode()
+        for s in server.serve(environ, lambda status, headers: responses.append(status)))
+    return responses[0], body
+
+
+def test_lru(boxesserver):
+    cache = boxesserver.RenderCache(10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"  # now most recently used
+    cache.put("c", b"123")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.get("c") == b"123"
+    cache.put("d", b"12345678901")  # too large
+    assert cache.get("d") is None
+    assert cache.size == 8
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_directory(boxesserver, tmp_path):
+    boxesserver.RenderCache(10, str(tmp_path)).put(("key", 1), b"data")
+    cache = boxesserver.RenderCache(10, str(tmp_path))
+    assert cache.get(("key", 1)) == b"data"
+    assert cache.disk_hits == 1
+    assert cache.get(("key", 1)) == b"data"
+    assert cache.hits == 1
+
+
+def test_directory_size(boxesserver, tmp_path):
+    cache = boxesserver.RenderCache(100, str(tmp_path))
+    for i in range(5):
+        cache.put(i, b"1234")
+        os.utime(cache._path(i), (i, i))
+    # least recently used files are removed on start...
+    cache = boxesserver.RenderCache(10, str(tmp_path))
+    assert cache.disk_size == 8
+    assert cache.get(0) is None
+    assert cache.get(3) == b"1234"  # now most recently used
+    # ... and when the limit is exceeded
+    cache.put(5, b"1234")
+    assert cache.disk_size == 8
+    cache = boxesserver.RenderCache(10, str(tmp_path))
+    assert [cache.get(i) is not None for i in range(6)] == [False] * 3 + [True, False, True]
+
+
+def test_directory_version(boxesserver, tmp_path):
+    (tmp_path / "README").write_text("not a cache file")
+    boxesserver.RenderCache(10, str(tmp_path), "0123").put("key", b"old")
+    cache = boxesserver.RenderCache(10, str(tmp_path), "4567")
+    assert cache.get("key") is None
+    assert [p.name for p in tmp_path.iterdir()] == ["README"]
+    assert len(boxesserver.code_version()) == 16
+
+
+def test_cached_render(boxesserver):
+    date = datetime.datetime(2000, 1, 1)
+    server = boxesserver.BServer(cache_size=2**20, creation_date=date)
+    query = "render=1&x=80&format=svg"
+    status, first = get(server, "/ClosedBox", query)
+    assert status == "200 OK"
+    assert get(server, "/ClosedBox", query)[1] == first
+    assert server.render_cache.hits == 1
+    assert boxesserver.BServer(creation_date=date).render_cache is None
+    assert get(boxesserver.BServer(creation_date=date), "/ClosedBox", query)[1] == first
+
+
+def test_cache_key_host(boxesserver):
+    server = boxesserver.BServer(cache_size=2**20)
+    query = "render=1&x=123&qr_code=1"
+    assert b"evil.example" in get(server, "/ClosedBox", query, "evil.example")[1]
+    body = get(server, "/ClosedBox", query, "boxes.example.org")[1]
+    assert b"boxes.example.org" in body
+    assert b"evil.example" not in body
+    assert server.render_cache.hits == 0
+
+
+def test_cache_stats(boxesserver):
+    server = boxesserver.BServer(cache_size=2**20)
+    assert b"hits:" not in get(server, "/cache_stats")[1]
+    server = boxesserver.BServer(cache_size=2**20, cache_stats=True)
+    assert b"hits: 0" in get(server, "/cache_stats")[1]
+
+
+def test_pooled_server_backpressure(boxesserver, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    handled = []
+
+    def finish_request(self, request, client_address):
+        started.set()
+        release.wait(5)
+        handled.append(client_address)
+
+    monkeypatch.setattr(boxesserver.PooledWSGIServer, "finish_request", finish_request)
+    monkeypatch.setattr(boxesserver.PooledWSGIServer, "queue_factor", 2)
+    server = boxesserver.PooledWSGIServer(("127.0.0.1", 0), WSGIRequestHandler, threads=1)
+    sockets = [socket.socketpair()[0] for i in range(3)]
+    for i, s in enumerate(sockets[:2]):
+        server.process_request(s, i)
+    started.wait(5)
+    # the third request waits for a free slot
+    third = threading.Thread(target=server.process_request, args=(sockets[2], 2))
+    third.start()
+    third.join(0.2)
+    assert third.is_alive()
+    release.set()
+    third.join(5)
+    assert not third.is_alive()
+    server.server_close()
+    assert handled == [0, 1, 2]
+    assert server._pool is None
@@ -0,0 +1,61 @@
+"""Command line interface (scripts/boxes)"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BOXES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "boxes")
+
+
+def boxes(*args, cwd=None):
+    return subprocess.run([sys.executable, BOXES, *args], capture_output=True,
+                          text=True, cwd=cwd)
+
+
+def write_jobs(tmp_path, jobs):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in jobs) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("order", ["batch_first", "jobs_first"])
+def test_batch(tmp_path, order):
+    jobs = write_jobs(tmp_path, [
+        {"generator": "ClosedBox", "args": {"x": 50}, "output": str(tmp_path / "a.svg")},
+        {"generator": "ClosedBox", "args": ["--x=60", "--format=ps"],
+         "output": str(tmp_path / "b.ps")},
+    ])
+    args = ["--batch=" + jobs, "--jobs=2"]
+    if order == "jobs_first":
+        args.reverse()
+    p = boxes(*args)
+    assert p.returncode == 0, p.stderr
+    assert "2 jobs, 0 failed" in p.stdout
+    assert (tmp_path / "a.svg").read_bytes().startswith(b"<?xml")
+    assert (tmp_path / "b.ps").read_bytes().startswith(b"%!PS")
+
+
+def test_batch_failures(tmp_path):
+    jobs = write_jobs(tmp_path, [
+        {"generator": "NoSuchGenerator"},
+        {"generator": "ClosedBox", "args": {"x": "wide"}, "output": str(tmp_path / "a.svg")},
+    ])
+    p = boxes("--jobs=1", "--batch", jobs)
+    assert p.returncode == 1
+    assert "2 jobs, 2 failed" in p.stdout
+    assert "Unknown generator 'NoSuchGenerator'" in p.stdout
+
+
+def test_batch_unknown_option(tmp_path):
+    p = boxes("--batch=" + write_jobs(tmp_path, []), "--x=3")
+    assert p.returncode == 2
+    assert "unrecognized arguments: --x=3" in p.stderr
+
+
+def test_generator(tmp_path):
+    p = boxes("ClosedBox", "--x=50", "--output=" + str(tmp_path / "box.svg"))
+    assert p.returncode == 0, p.stderr
+    assert (tmp_path / "box.svg").exists()
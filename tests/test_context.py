@@ -0,0 +1,108 @@
+"""Drawing context (drawing.Context)"""
+
+import math
+
+import numpy as np
+import pytest
+from affine import Affine
+
+from boxes import drawing
+from boxes.drawing import IDENTITY, _mul, _rotation, _translate
+from conftest import paths
+
+M = (2.0, 0.5, 3.0, -1.0, 1.5, 4.0)
+
+
+def test_mul():
+    n = (0.5, 1.0, -2.0, 3.0, 0.25, 1.0)
+    assert _mul(M, n) == pytest.approx(tuple(Affine(*M) * Affine(*n))[:6])
+    assert _mul(M, IDENTITY) == M
+    assert _mul(IDENTITY, M) == M
+
+
+def test_translate():
+    assert _translate(M, 5, -7) == pytest.approx(
+        tuple(Affine(*M) * Affine.translation(5, -7))[:6])
+
+
+@pytest.mark.parametrize("degrees", [0, 30, 90, 180, 270, -90, 450, 123.4])
+def test_rotation(degrees):
+    assert _rotation(degrees) == pytest.approx(tuple(Affine.rotation(degrees))[:6])
+
+
+def test_rotation_exact():
+    assert _rotation(90) == (0.0, -1.0, 0.0, 1.0, 0.0, 0.0)
+    assert _rotation(-90) == (0.0, 1.0, 0.0, -1.0, 0.0, 0.0)
+    assert _rotation(180) == (-1.0, -0.0, 0.0, 0.0, -1.0, 0.0)
+    for degrees in (0, 90, 180, 270):
+        assert {type(v) for v in _rotation(degrees)} == {float}
+
+
+def test_context_transformation(box):
+    ctx = box.ctx
+    m = ctx._m
+    ctx.translate(10, 20)
+    ctx.rotate(0.5)
+    ctx.scale(2, 3)
+    expected = (Affine(*m) * Affine.translation(10, 20) *
+                Affine.rotation(math.degrees(0.5)) * Affine.scale(2, 3))
+    assert ctx._m == pytest.approx(tuple(expected)[:6])
+    assert ctx._transform(1, 1) == pytest.approx(expected * (1, 1))
+
+
+POINTS = [(10, 0), (10, 0), (10, 5), (0, 5), (0, 5.0000001), (0, 0)]
+CURVES = [(1, 2, 3, 4, 5, 6), (5, 6, 5, 6, 5, 6), (7, 8, 9, 10, 11, 12)]
+
+
+@pytest.mark.parametrize("numpy_min_points", [1, drawing.NUMPY_MIN_POINTS])
+@pytest.mark.parametrize("recording", [False, True])
+def test_lines_and_curves(make_box, monkeypatch, recording, numpy_min_points):
+    monkeypatch.setattr(drawing, "NUMPY_MIN_POINTS", numpy_min_points)
+
+    def draw(box, bulk):
+        box.moveTo(20, 30, 30)
+        box.ctx.move_to(0, 0)
+        if bulk:
+            box.ctx.lines(POINTS)
+            box.ctx.curves(CURVES)
+        else:
+            for x, y in POINTS:
+                box.ctx.line_to(x, y)
+            for curve in CURVES:
+                box.ctx.curve_to(*curve)
+        box.ctx.line_to(0, 0)
+        return box.ctx.get_current_point()
+
+    result = {}
+    for bulk in (False, True):
+        box = make_box()
+        if recording:
+            with box.ctx.local_recording() as r:
+                end = draw(box, bulk)
+            box.ctx.replay_local(r)
+        else:
+            end = draw(box, bulk)
+        result[bulk] = end, paths(box)
+    assert result[True] == result[False]
+    assert [s[0] for s in result[True][1][0]] == ["M"] + ["L"] * 4 + ["C"] * 3 + ["L"]
+
+
+def test_lines_array(make_box):
+    points = [(i % 7, i // 3) for i in range(drawing.NUMPY_MIN_POINTS + 1)]
+    result = []
+    for p in (points, np.array(points, dtype=float)):
+        box = make_box()
+        box.moveTo(3, 4, 33)
+        box.ctx.move_to(0, 0)
+        box.ctx.lines(p)
+        result.append((box.ctx.get_current_point(), box.ctx._mxy, paths(box)))
+    assert result[0] == result[1]
+    assert {type(v) for v in result[1][0] + result[1][1]} == {float}
+
+
+def test_lines_empty(box):
+    box.ctx.move_to(1, 2)
+    box.ctx.lines([])
+    box.ctx.curves([])
+    assert box.ctx.get_current_point() == (1, 2)
+    assert paths(box) == []
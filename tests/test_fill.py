@@ -0,0 +1,55 @@
+"""Helpers of Boxes.fillHoles()"""
+
+import random
+
+import pytest
+from shapely.geometry import LinearRing, Point
+
+from boxes import ringDistances
+
+
+def test_ringDistances():
+    rnd = random.Random(0)
+    ring = LinearRing([(0, 0), (100, 0), (100, 50), (30, 60), (0, 50)])
+    points = [(rnd.uniform(-20, 120), rnd.uniform(-20, 80)) for i in range(200)]
+    points.extend(ring.coords)  # on the ring
+    expected = [ring.distance(Point(p)) for p in points]
+    assert ringDistances(ring, points) == pytest.approx(expected)
+    assert ringDistances(ring, []) == []
+
+
+BORDER = [(0, 0), (120, 0), (120, 80), (60, 100), (0, 80)]
+
+
+def random_holes(box, seed=0):
+    from shapely.geometry import Polygon
+    return box._randomHoles(Polygon(BORDER), 6.0, 2.0, 3.0, 1.0, 1000, seed)
+
+
+def test_random_holes(box):
+    from shapely.geometry import Point, Polygon
+    holes = random_holes(box)
+    assert len(holes) > 20
+    polygon = Polygon(BORDER)
+    for x, y, r in holes:
+        assert 1.0 - 1e-9 <= r <= 6.0 + 1e-9
+        assert polygon.exterior.distance(Point(x, y)) >= r + 3.0 - 1e-6
+    for i, (x1, y1, r1) in enumerate(holes):
+        for x2, y2, r2 in holes[:i]:
+            assert ((x1 - x2)**2 + (y1 - y2)**2)**0.5 >= r1 + r2 + 2.0 - 1e-6
+
+
+def test_random_holes_seed(box):
+    assert random_holes(box, 1) == random_holes(box, 1)
+    assert random_holes(box, 1) != random_holes(box, 2)
+
+
+def test_fillHoles_default_seed(make_box):
+    def fill():
+        box = make_box()
+        box.fillHoles("random", BORDER, 5.0)
+        return [list(p) for part in box.surface.parts for p in part.pathes]
+
+    first = fill()
+    assert first
+    assert fill() == first
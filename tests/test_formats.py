@@ -0,0 +1,309 @@
+"""Output formats written without external tools"""
+
+import math
+import random
+import re
+import zlib
+
+import pytest
+
+from boxes import Boxes
+from boxes.drawing import (
+    PDFSurface, _bezier_arc, _dxf_text, _flatten_bezier, _pdf_string,
+    _sort_cuts, _travel)
+from boxes.generators.closedbox import ClosedBox
+from boxes.generators.typetray import TypeTray
+from conftest import render
+
+
+class Sample(Boxes):
+    """Outline with round and sharp corners, a hole and a text"""
+
+    def render(self):
+        self.moveTo(10, 10)
+        for length, radius in ((20, 5), (10, 0), (25, 0), (15, 0)):
+            self.edge(length)
+            self.corner(90, radius)
+        self.hole(40, 20, 3)
+        self.text("Hi", 50, 5)
+
+
+def circle_center(p1, p2, p3, *_):
+    """Center of the circle through three points"""
+    (ax, ay), (bx, by), (cx, cy) = p1, p2, p3
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    a, b, c = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+    return ((a * (by - cy) + b * (cy - ay) + c * (ay - by)) / d,
+            (a * (cx - bx) + b * (ax - cx) + c * (bx - ax)) / d)
+
+
+### DXF
+
+def dxf_groups(data):
+    """Return (code, value) pairs of a DXF file"""
+    lines = data.decode("ascii").splitlines()
+    assert len(lines) % 2 == 0
+    return [(int(lines[i]), lines[i + 1]) for i in range(0, len(lines), 2)]
+
+
+def dxf_entities(groups):
+    """Return the entities as (type, [(code, value), ...])"""
+    start = groups.index((2, "ENTITIES"))
+    end = groups.index((0, "ENDSEC"), start)
+    entities = []
+    for code, value in groups[start + 1:end]:
+        if code == 0:
+            entities.append((value, []))
+        else:
+            entities[-1][1].append((code, value))
+    return entities
+
+
+@pytest.mark.parametrize("cls", [Sample, ClosedBox, TypeTray])
+def test_dxf_structure(make_box, cls):
+    groups = dxf_groups(render(make_box, cls, fmt="dxf").output.getvalue())
+    assert groups[-1] == (0, "EOF")
+    sections = [v for c, v in groups if c == 0 and v in ("SECTION", "ENDSEC")]
+    assert sections == ["SECTION", "ENDSEC"] * 3
+    assert (1, "AC1015") in groups
+    # handles are unique and below $HANDSEED
+    seed = groups[groups.index((9, "$HANDSEED")) + 1]
+    handles = [int(v, 16) for c, v in groups[groups.index((2, "TABLES")):] if c == 5]
+    assert len(handles) == len(set(handles))
+    assert max(handles) < int(seed[1], 16)
+    # all entities are on a defined layer
+    layer_table = groups.index((2, "LAYER"))
+    layers = {v for c, v in groups[layer_table:groups.index((0, "ENDTAB"), layer_table)]
+              if c == 2}
+    entities = dxf_entities(groups)
+    assert entities
+    for kind, values in entities:
+        assert kind in ("LWPOLYLINE", "SPLINE", "TEXT")
+        assert dict(values)[8] in layers
+
+
+def test_dxf_arcs_as_bulges(make_box):
+    entities = dxf_entities(dxf_groups(render(make_box, Sample, fmt="dxf").output.getvalue()))
+    outline, hole, text = entities
+    assert [kind for kind, _ in entities] == ["LWPOLYLINE"] * 2 + ["TEXT"]
+    assert dict(outline[1])[8] == "BLACK"
+    assert dict(hole[1])[8] == "BLUE"
+    assert dict(text[1])[1] == "Hi"
+
+    # the hole is a closed polyline of arcs around its center
+    values = hole[1]
+    assert dict(values)[70] == "1"
+    xs = [float(v) for c, v in values if c == 10]
+    ys = [float(v) for c, v in values if c == 20]
+    bulges = [float(v) for c, v in values if c == 42]
+    assert len(xs) == len(ys) == len(bulges) == int(dict(values)[90])
+    xc, yc = circle_center(*zip(xs, ys))
+    assert (xc, yc) == pytest.approx((50.1, 30), abs=0.02)  # shifted by burn
+    for x, y in zip(xs, ys):
+        assert math.hypot(x - xc, y - yc) == pytest.approx(2.9, abs=0.02)
+    # bulge is tan(angle / 4) - all together they make a full circle
+    assert sum(4 * math.atan(b) for b in bulges) == pytest.approx(-2 * math.pi, rel=1e-4)
+
+    # 90° corners of the outline
+    bulges = [float(v) for c, v in outline[1] if c == 42]
+    assert bulges.count(pytest.approx(math.tan(math.pi / 8), abs=1e-6)) == 3
+
+
+def test_dxf_text():
+    assert _dxf_text("a\nb ä€") == "a b \\U+00E4\\U+20AC"
+
+
+### PDF
+
+def pdf_objects(data):
+    """Check the cross reference table and return the objects by number"""
+    assert data.startswith(b"%PDF-1.4\n")
+    assert data.endswith(b"%%EOF\n")
+    xref = int(data.rsplit(b"startxref\n", 1)[1].split()[0])
+    assert data[xref:].startswith(b"xref\n")
+    lines = data[xref:].split(b"\n")
+    count = int(lines[1].split()[1])
+    objects = {}
+    for i, line in enumerate(lines[3:3 + count - 1], 1):
+        offset = int(line.split()[0])
+        assert data[offset:].startswith(b"%i 0 obj\n" % i)
+        objects[i] = data[offset:data.index(b"\nendobj\n", offset)]
+    return objects
+
+
+def pdf_content(objects):
+    obj = objects[4]
+    length = int(re.search(rb"/Length (\d+)", obj).group(1))
+    stream = obj[obj.index(b"stream\n") + 7:][:length]
+    assert obj[obj.index(b"stream\n") + 7 + length:].endswith(b"\nendstream")
+    if b"/FlateDecode" in obj:
+        stream = zlib.decompress(stream)
+    return stream.decode("latin1")
+
+
+@pytest.mark.parametrize("cls", [Sample, ClosedBox, TypeTray])
+def test_pdf_structure(make_box, cls):
+    objects = pdf_objects(render(make_box, cls, fmt="pdf").output.getvalue())
+    assert b"/Type /Catalog" in objects[1]
+    assert b"/Type /Page " in objects[3]
+    assert b"/Title (Boxes.py - " in objects[5]
+    content = pdf_content(objects)
+    assert content.count(" m\n") > 0
+    assert content.count("\nS\n") == content.count(" RG\n")
+
+
+def test_pdf_content(make_box, monkeypatch):
+    monkeypatch.setattr(PDFSurface, "compress", False)
+    box = render(make_box, Sample, fmt="pdf")
+    objects = pdf_objects(box.output.getvalue())
+    content = pdf_content(objects)
+    # page size is the size of the drawing
+    width, height = map(float, re.search(
+        rb"/MediaBox \[0 0 ([\d.]+) ([\d.]+)\]", objects[3]).groups())
+    assert width > 35 and height > 25
+    # outer cut in black, the hole in blue, arcs as curves
+    assert "0.00 0.00 0.00 RG" in content
+    assert "0.00 0.00 1.00 RG" in content
+    assert content.count(" c\n") > 3
+    # text with its font
+    assert "(Hi) Tj" in content
+    assert re.search(r"/F1 [\d.]+ Tf", content)
+    assert b"/BaseFont /Helvetica " in objects[6]
+
+
+def test_pdf_text_width():
+    surface = PDFSurface(None)
+    assert surface._text_width("Helvetica", "Hi") == 722 + 222
+    assert surface._text_width("Courier-BoldOblique", "Hi\u2603") == 3 * 600
+    assert surface._upright("Times-BoldItalic") == "Times-Bold"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("plain", "(plain)"),
+    ("a (b) \\ c", "(a \\(b\\) \\\\ c)"),
+    ("line\nbreak\r", "(line\\nbreak\\r)"),
+    ("ä€", "(\xe4\x80)"),
+    ("\u2603", "(?)"),
+])
+def test_pdf_string(text, expected):
+    assert _pdf_string(text) == expected
+
+
+### G-code and HP-GL
+
+def gcode_cuts(data):
+    """Run the G-code and return the cuts as (color, [segments])"""
+    lines = data.decode("ascii").splitlines()
+    assert lines[4:8] == ["G21", "G90", "M5", "F1000"]
+    assert lines[-2:] == ["G0 X0 Y0", "M2"]
+    cuts = []
+    color = None
+    on = False
+    x = y = 0.0
+    for line in lines[8:-2]:
+        if line.startswith("; color"):
+            color = line[8:]
+            continue
+        cmd, *args = line.split()
+        values = {a[0]: float(a[1:]) for a in args if a[0] in "XYIJ"}
+        if cmd == "M3":
+            assert not on
+            on = True
+            cuts.append((color, []))
+        elif cmd == "M5":
+            assert on
+            on = False
+        elif cmd == "G0":
+            assert not on
+        else:
+            assert on and cmd in ("G1", "G2", "G3")
+            if cmd != "G1":
+                # the end point is on the circle, too
+                xc, yc = x + values["I"], y + values["J"]
+                assert (math.hypot(values["X"] - xc, values["Y"] - yc) ==
+                        pytest.approx(math.hypot(x - xc, y - yc), abs=0.002))
+            cuts[-1][1].append(cmd)
+        if "X" in values:
+            x, y = values["X"], values["Y"]
+    assert not on
+    return cuts
+
+
+def test_gcode(make_box):
+    data = render(make_box, Sample, fmt="gcode").output.getvalue()
+    assert data.startswith(b"; Boxes.py - ")
+    cuts = gcode_cuts(data)
+    # inner cuts first, the text is skipped
+    hole, outline = cuts
+    assert hole == ("0 0 1", ["G2"] * 11)
+    assert outline[0] == "0 0 0"
+    assert outline[1].count("G1") == 4
+    assert outline[1].count("G3") == 6
+
+
+@pytest.mark.parametrize("cls", [ClosedBox, TypeTray])
+def test_gcode_generators(make_box, cls):
+    box = render(make_box, cls, fmt="gcode")
+    assert gcode_cuts(box.output.getvalue())
+    assert 0 < box.surface.travel <= box.surface.travel_unsorted
+
+
+def test_hpgl(make_box):
+    gcode = render(make_box, TypeTray, fmt="gcode").output.getvalue().decode()
+    hpgl = render(make_box, TypeTray, fmt="plt").output.getvalue().decode()
+    assert hpgl.startswith("IN;SP")
+    assert hpgl.endswith(";PU;\nSP0;\n")
+    # same cuts in the same order with 40 units per mm
+    starts = [tuple(round(float(v[1:]) * 40) for v in line.split()[1:])
+              for line in gcode.splitlines() if line.startswith("G0 ")][:-1]
+    assert [tuple(map(int, m)) for m in re.findall(r"PU(-?\d+),(-?\d+);", hpgl)] == \
+        pytest.approx(starts, abs=1)
+    assert hpgl.count("AA") == gcode.count("\nG2 ") + gcode.count("\nG3 ")
+
+
+def test_sort_cuts():
+    rng = random.Random(4)
+    cuts = []
+    for _ in range(200):
+        x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+        cuts.append([("M", x, y), ("L", x + rng.uniform(-5, 5), y + rng.uniform(-5, 5))])
+    ordered, travel = _sort_cuts(cuts, 0.0, 0.0)
+    assert len(ordered) == len(cuts)
+    assert {frozenset(c[0][1:3] for c in cut) for cut in ordered} == \
+        {frozenset(c[0][1:3] for c in cut) for cut in cuts}
+    assert travel == pytest.approx(_travel(ordered, 0.0, 0.0))
+    assert travel < _travel(cuts, 0.0, 0.0) / 5
+
+    # same as always searching the nearest end of all cuts
+    x = y = 0.0
+    todo = list(cuts)
+    for cut in ordered:
+        nearest = min(math.hypot(c[i][1] - x, c[i][2] - y) for c in todo for i in (0, -1))
+        assert math.hypot(cut[0][1] - x, cut[0][2] - y) == pytest.approx(nearest)
+        todo = [c for c in todo if {c[0][1:3], c[-1][1:3]} != {cut[0][1:3], cut[-1][1:3]}]
+        x, y = cut[-1][1:3]
+
+
+def test_bezier_arc():
+    # control points as in Context._arc()
+    xc, yc, r, angle = 1.0, 2.0, 3.0, math.radians(60)
+    ax, ay = r, 0.0
+    bx, by = r * math.cos(angle), r * math.sin(angle)
+    k2 = 4 / 3 * ((2 * r * r * (r * r + ax * bx)) ** 0.5 - (r * r + ax * bx)) / (ax * by - ay * bx)
+    curve = (xc + ax, yc + ay, xc + ax - k2 * ay, yc + ay + k2 * ax,
+             xc + bx + k2 * by, yc + by - k2 * bx, xc + bx, yc + by)
+    assert _bezier_arc(*curve) == pytest.approx((xc, yc, angle))
+    # reversed
+    reverse = curve[6:8] + curve[4:6] + curve[2:4] + curve[0:2]
+    assert _bezier_arc(*reverse) == pytest.approx((xc, yc, -angle))
+    # not an arc
+    assert _bezier_arc(0, 0, 1, 1, 2, 1, 3, 0) is None
+    assert _bezier_arc(0, 0, 1, 0, 2, 0, 3, 0) is None
+
+
+def test_flatten_bezier():
+    curve = (0, 0, 10, 20, 20, -20, 30, 0)
+    points = _flatten_bezier(*curve, 0.01)
+    assert points[-1] == (30, 0)
+    assert len(points) > 10
+    assert _flatten_bezier(0, 0, 1, 0, 2, 0, 3, 0, 0.01) == [(3, 0)]
@@ -0,0 +1,20 @@
+"""Gear options and outlines (boxes.gears)"""
+
+import pytest
+
+from boxes.gears import GearOptions
+
+
+def test_options():
+    options = GearOptions(teeth=12, dimension="3", pitchcircle=True,
+                          draw_rack="False")
+    assert options.teeth == 12
+    assert options.dimension == 3.0
+    assert options.pitchcircle is True
+    assert options.drawrack is False
+    assert options.angle == 20.0  # default
+
+
+def test_unknown_option():
+    with pytest.raises(ValueError):
+        GearOptions(teeths=12)
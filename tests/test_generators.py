@@ -0,0 +1,38 @@
+"""Generator index read from the sources (boxes.generators)"""
+
+import os
+
+import pytest
+
+import boxes.generators
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(boxes.generators, "_index", None)
+    return boxes.generators.getGeneratorIndex()
+
+
+def test_index_matches_imported_generators(index):
+    generators = boxes.generators.getAllBoxGenerators()
+    # classes imported into other generator modules are only indexed once
+    defined = {name: cls for name, cls in generators.items()
+               if name.rsplit(".", 1)[0] == cls.__module__}
+    assert set(index) == set(defined)
+    for name, info in index.items():
+        cls = defined[name]
+        assert info.ui_group == cls.ui_group, name
+        assert info.webinterface == cls.webinterface, name
+        assert info.__doc__ == cls.__doc__, name
+        assert info.load() is cls
+
+
+def test_index_cache(index, tmp_path, monkeypatch):
+    files = list((tmp_path / "boxes.py").iterdir())
+    assert len(files) == 1
+    assert not os.path.exists(os.path.join(boxes.generators.__path__[0], "_index.json"))
+    # second run reads the cache file
+    monkeypatch.setattr(boxes.generators, "_index", None)
+    monkeypatch.setattr(boxes.generators, "_scanModule", None)
+    assert set(boxes.generators.getGeneratorIndex()) == set(index)
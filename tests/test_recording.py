@@ -0,0 +1,92 @@
+"""Recording and replaying of drawing commands (drawing.LocalRecording)"""
+
+import pytest
+
+from boxes.generators.closedbox import ClosedBox
+from boxes.generators.dividertray import DividerTray
+from boxes.generators.drillbox import DrillBox
+from boxes.generators.filltest import FillTest
+from boxes.generators.flexbox import FlexBox
+from boxes.generators.smallpartstray import SmallPartsTray
+from boxes.generators.typetray import TypeTray
+from conftest import assert_same_drawing, paths, render
+
+
+def draw(box):
+    box.edge(10)
+    box.corner(45)
+    box.text("hello", 10, 10)
+    box.ctx.curve_to(1, 2, 3, 4, 5, 6)
+    box.ctx.stroke()
+
+
+def test_replay_local_matches_direct_drawing(box, make_box):
+    box.moveTo(20, 30, 30)
+    with box.ctx.local_recording() as recording:
+        draw(box)
+    assert paths(box) == []
+    box.ctx.replay_local(recording)
+    replayed = paths(box)
+
+    direct = make_box()
+    direct.moveTo(20, 30, 30)
+    draw(direct)
+    assert_same_drawing(replayed, paths(direct))
+
+
+def test_replay_local_text(box):
+    with box.ctx.local_recording() as recording:
+        box.text("hello", 10, 10)
+    box.moveTo(50, 50, 90)
+    box.ctx.replay_local(recording)
+    box.moveTo(0, 20)
+    box.ctx.replay_local(recording)
+    texts = [s for p in paths(box) for s in p if s[0] == "T"]
+    assert len(texts) == 2
+    assert [t[4] for t in texts] == ["hello", "hello"]
+    box.close()
+    assert box.output.getvalue().count(b"hello") == 2
+
+
+@pytest.mark.parametrize("cls", [ClosedBox, FlexBox])
+def test_edgecaching(make_box, cls):
+    args = ["--x=200", "--y=150", "--h=100"]
+    assert_same_drawing(paths(render(make_box, cls, args)),
+                        paths(render(make_box, cls, args, edgecaching=False)))
+
+
+@pytest.mark.parametrize("cls, args", [
+    (TypeTray, ["--sx=30*5", "--sy=20*4", "--gripheight=10"]),
+    (DividerTray, []),
+    (SmallPartsTray, []),
+])
+def test_partcaching(make_box, cls, args):
+    assert cls.partcaching
+    assert_same_drawing(paths(render(make_box, cls, args)),
+                        paths(render(make_box, cls, args, partcaching=False)))
+
+
+@pytest.mark.parametrize("cls, args", [
+    (DrillBox, []),
+    (FillTest, ["--fillHoles_fill_pattern=hex", "--fillHoles_hole_style=hexagon"]),
+])
+def test_instancing(make_box, cls, args):
+    assert_same_drawing(paths(render(make_box, cls, args)),
+                        paths(render(make_box, cls, args, instancing=False)))
+
+
+def test_instancing_position_and_color(box, make_box):
+    def draw(box):
+        for i in range(3):
+            box.hole(10 + 20 * i, 10, 5)
+            box.rectangularHole(10 + 20 * i, 30, 8, 4, r=1)
+        box.set_source_color((0.0, 0.0, 1.0))
+        box.hole(10, 50, 5)
+        box.moveTo(100, 100, 30)
+        box.hole(0, 0, 5)
+
+    draw(box)
+    direct = make_box()
+    direct.instancing = False
+    draw(direct)
+    assert_same_drawing(paths(box), paths(direct))
@@ -0,0 +1,39 @@
+"""SVG output (drawing.SVGSurface)"""
+
+import datetime
+from xml.etree import ElementTree as ET
+
+import pytest
+
+from boxes.drawing import _xml_element
+from boxes.generators.closedbox import ClosedBox
+from boxes.generators.typetray import TypeTray
+
+SPECIAL = 'a < b & "c" \'d\' > e\n\tf ä €'
+
+
+def render_svg(make_box, cls, streaming):
+    box = make_box(cls, ["--reference=100"])
+    box.metadata["creation_date"] = datetime.datetime(2000, 1, 1)
+    box.metadata["description"] = SPECIAL
+    box.metadata["cli"] += SPECIAL
+    box.surface.streaming = streaming
+    box.render()
+    box.text(SPECIAL, 10, 10, align="center")
+    box.close()
+    return box.output.getvalue()
+
+
+@pytest.mark.parametrize("cls", [ClosedBox, TypeTray])
+def test_streamed_equals_etree(make_box, cls):
+    streamed = render_svg(make_box, cls, True)
+    assert streamed == render_svg(make_box, cls, False)
+    assert b"a &lt; b &amp; \"c\" 'd' &gt; e" in streamed
+
+
+@pytest.mark.parametrize("text", ["", "plain", SPECIAL, "\r\n", "&amp;"])
+def test_xml_element(text):
+    attrib = {"a": "1", "m": SPECIAL, "z": text}  # ElementTree keeps the order
+    element = ET.Element("text", attrib)
+    element.text = text
+    assert _xml_element("text", text, attrib) == ET.tostring(element, encoding="unicode")
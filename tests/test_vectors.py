@@ -0,0 +1,67 @@
+"""NumPy versions of boxes.vectors against the per point functions"""
+
+import math
+import random
+
+import pytest
+
+from boxes.vectors import (dotproduct, kerf, kerf_array, mmul, mmul_array,
+                           normalize, rotm, rotm_array, vadd, vdiff,
+                           vorthogonal, vscalmul, vtransl, vtransl_array)
+
+
+def kerf_reference(points, k, closed=True):
+    """kerf() as implemented point by point before the NumPy version"""
+    result = []
+    lp = len(points)
+    for i in range(lp):
+        v1 = vorthogonal(normalize(vdiff(points[i - 1], points[i])))
+        v2 = vorthogonal(normalize(vdiff(points[i], points[(i + 1) % lp])))
+        if not closed:
+            if i == 0:
+                v1 = v2
+            if i == lp-1:
+                v2 = v1
+        d = normalize(vadd(v1, v2))
+        cos_alpha = dotproduct(v1, d)
+        result.append(vadd(points[i], vscalmul(d, -k / cos_alpha)))
+    return result
+
+
+def flat(points):
+    return [c for p in points for c in p]
+
+
+@pytest.mark.parametrize("closed", [True, False])
+def test_kerf(closed):
+    rnd = random.Random(0)
+    points = [(rnd.uniform(0, 100), rnd.uniform(0, 100)) for i in range(500)]
+    result = kerf(points, 0.1, closed)
+    assert all(isinstance(p, tuple) for p in result)
+    assert flat(result) == pytest.approx(flat(kerf_reference(points, 0.1, closed)))
+
+
+def test_kerf_square():
+    assert flat(kerf([(0, 0), (1, 0), (1, 1), (0, 1)], 0.5)) == pytest.approx(
+        [-0.5, -0.5, 1.5, -0.5, 1.5, 1.5, -0.5, 1.5])
+    assert kerf([], 0.5) == []
+    assert kerf_array([], 0.5).shape == (0, 2)
+
+
+def test_kerf_reversing():
+    with pytest.raises(ZeroDivisionError):
+        kerf([(0, 0), (1, 0), (1, 0)], 0.5)
+
+
+def test_rotation_stack():
+    rnd = random.Random(0)
+    points = [(rnd.uniform(-10, 10), rnd.uniform(-10, 10)) for i in range(20)]
+    m = [[1.1, 0, 0], [0, 0.9, -20]]
+    angles = [i * 2 * math.pi / 7 for i in range(7)]
+    expected = []
+    for a in angles:
+        r = mmul(m, rotm(a))
+        expected.extend(vtransl(p, r) for p in points)
+    result = vtransl_array(points, mmul_array(m, rotm_array(angles)))
+    assert result.shape == (7, 20, 2)
+    assert flat(result.reshape(-1, 2).tolist()) == pytest.approx(flat(expected))